@@ -0,0 +1,183 @@
+"""
+Benchmarks for ingest and the dashboard metrics, on synthetic chats.
+
+For every scale this generates a chat export (synthetic.py), ingests it with
+parse_whatsapp_chat, writes the snapshot, loads the frames the metrics use and
+runs every metric in the registry on the whole chat. Each step is timed (best
+and median of --repeat runs) and then run once more under tracemalloc for its
+peak Python allocation. Worker processes of a parallel ingest are not traced.
+
+The result is JSON, one record per (scale, step), so two runs can be diffed or
+compared with --compare:
+
+    python benchmark.py --messages 100000 1000000 --output after.json
+    python benchmark.py --compare before.json after.json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from wordcloud import WordCloud
+
+from parser import parse_whatsapp_chat
+from synthetic import write_chat
+from snapshot import write_snapshot
+from datasource import metric_data, read_messages
+from metrics import registry
+
+DEFAULT_SCALES = [100000]
+
+def measure(func, repeat=1, memory=True):
+    """
+    Runs func 'repeat' times. Returns (seconds, median_seconds, peak_mb);
+    peak_mb is None without memory tracing.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+    return min(timings), statistics.median(timings), peak_mb
+
+def benchmark_scale(messages, workdir, repeat=1, memory=True, bulk=True, workers=1, senders=8):
+    chat_file = os.path.join(workdir, f'chat_{messages}.txt')
+    db_file = os.path.join(workdir, f'chat_{messages}.db')
+    results = []
+
+    def record(step, func, rows, step_repeat=repeat):
+        seconds, median, peak_mb = measure(func, step_repeat, memory)
+        results.append({
+            'scale': messages,
+            'step': step,
+            'seconds': round(seconds, 6),
+            'median_seconds': round(median, 6),
+            'rows_per_sec': round(rows / seconds) if seconds > 0 else None,
+            'peak_mb': round(peak_mb, 2) if peak_mb is not None else None,
+        })
+        print(f"{messages:>10} {step:<28} {seconds:9.4f}s  peak {peak_mb or 0:8.1f} MB", file=sys.stderr)
+
+    if not os.path.exists(chat_file):
+        write_chat(chat_file, messages, senders=senders)
+
+    def ingest():
+        for path in (db_file, os.path.splitext(db_file)[0] + '.arrow'):
+            if os.path.exists(path):
+                os.remove(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            parse_whatsapp_chat(chat_file, db_file, bulk=bulk, workers=workers)
+
+    record('ingest', ingest, messages)
+    record('load:messages_sqlite', lambda: read_messages(db_file), messages)
+    record('snapshot', lambda: write_snapshot(db_file), messages)
+    record('load:messages_snapshot', lambda: read_messages(db_file), messages)
+
+    # Each frame loaded on its own; the metrics below then only pay for themselves
+    def fresh_data():
+        return metric_data(db_file)
+
+    for frame in ('rollup', 'tokens', 'emojis'):
+        record(f'load:{frame}', lambda frame=frame: getattr(fresh_data(), frame), messages)
+
+    data = fresh_data()
+    for frame in ('messages', 'rollup', 'tokens', 'emojis'):
+        getattr(data, frame)
+
+    def run_metric(name):
+        registry.clear()
+        registry.get(name, data)
+
+    for name in registry.names():
+        record(f'metric:{name}', lambda name=name: run_metric(name), messages)
+
+    def render_wordcloud():
+        frequencies = registry.get('word_frequencies', data)
+        WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(frequencies).to_image()
+
+    record('render:wordcloud', render_wordcloud, messages)
+    registry.clear()
+    return results
+
+def run(scales, workdir=None, repeat=1, memory=True, bulk=True, workers=1, senders=8):
+    with contextlib.ExitStack() as stack:
+        if workdir is None:
+            workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix='chat-bench-'))
+        else:
+            os.makedirs(workdir, exist_ok=True)
+
+        results = []
+        for messages in scales:
+            results += benchmark_scale(messages, workdir, repeat=repeat, memory=memory,
+                                       bulk=bulk, workers=workers, senders=senders)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+        'settings': {'repeat': repeat, 'memory': memory, 'bulk': bulk, 'workers': workers, 'senders': senders},
+        'results': results,
+    }
+
+def compare(old_report, new_report):
+    """Prints the steps of both reports side by side, with the new/old time ratio."""
+    old = {(r['scale'], r['step']): r for r in old_report['results']}
+    print(f"{'scale':>10} {'step':<28} {'old s':>10} {'new s':>10} {'ratio':>7} {'old MB':>9} {'new MB':>9}")
+    for r in new_report['results']:
+        before = old.get((r['scale'], r['step']))
+        if before is None:
+            print(f"{r['scale']:>10} {r['step']:<28} {'-':>10} {r['seconds']:>10.4f}")
+            continue
+        ratio = r['seconds'] / before['seconds'] if before['seconds'] else float('nan')
+        print(f"{r['scale']:>10} {r['step']:<28} {before['seconds']:>10.4f} {r['seconds']:>10.4f} {ratio:>7.2f}"
+              f" {before['peak_mb'] or 0:>9.1f} {r['peak_mb'] or 0:>9.1f}")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark ingest and dashboard metrics on synthetic chats.")
+    arg_parser.add_argument('--messages', type=int, nargs='+', default=DEFAULT_SCALES,
+                            help="Chat sizes to benchmark (default 100000)")
+    arg_parser.add_argument('--repeat', type=int, default=1, help="Timed runs per step")
+    arg_parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass (halves the run time)")
+    arg_parser.add_argument('--no-bulk', action='store_true', help="Ingest row by row instead of in batches")
+    arg_parser.add_argument('--workers', type=int, default=1, help="Parser processes for the ingest step")
+    arg_parser.add_argument('--senders', type=int, default=8)
+    arg_parser.add_argument('--workdir', default=None, help="Keep generated chats and databases here (reused on the next run)")
+    arg_parser.add_argument('--output', default=None, help="Write the JSON report here instead of stdout")
+    arg_parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Compare two reports and exit")
+    args = arg_parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as old_file, open(args.compare[1]) as new_file:
+            compare(json.load(old_file), json.load(new_file))
+        sys.exit(0)
+
+    report = run(args.messages, workdir=args.workdir, repeat=args.repeat, memory=not args.no_memory,
+                 bulk=not args.no_bulk, workers=args.workers, senders=args.senders)
+    output = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
@@ -0,0 +1,56 @@
+"""
+Several chats side by side: one shard database per chat.
+
+Every chat gets its own SQLite file in the chat directory (chats/<chat_id>.db),
+with its own derived tables, snapshot and report next to it. Nothing in the
+schema has to know about other chats, a chat can be re-ingested or deleted on
+its own, and the dashboard opens only the shard of the selected chat.
+
+The chat id comes from the export's file name: "WhatsApp Chat with De
+Leeuwen.txt" becomes "de-leeuwen". Two exports with the same chat id are an
+error, not a merge.
+"""
+import os
+import re
+import unicodedata
+
+CHAT_DIR = 'chats'
+SHARD_SUFFIX = '.db'
+
+_EXPORT_PREFIX = re.compile(r'^whatsapp chat (with|met) ', re.IGNORECASE)
+
+def chat_id_for(export_file):
+    name = os.path.splitext(os.path.basename(export_file))[0]
+    name = _EXPORT_PREFIX.sub('', name)
+    # "Café" becomes "cafe", not "caf"
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    chat_id = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+    return chat_id or 'chat'
+
+def shard_path(chat_id, chat_dir=CHAT_DIR):
+    return os.path.join(chat_dir, chat_id + SHARD_SUFFIX)
+
+def find_exports(input_dir):
+    """
+    The export files (*.txt) in input_dir as {chat_id: path}. Raises ValueError
+    when two files would end up in the same chat.
+    """
+    exports = {}
+    for name in sorted(os.listdir(input_dir)):
+        path = os.path.join(input_dir, name)
+        if not name.lower().endswith('.txt') or not os.path.isfile(path):
+            continue
+        chat_id = chat_id_for(name)
+        if chat_id in exports:
+            raise ValueError(f"'{exports[chat_id]}' and '{path}' would both become chat '{chat_id}'")
+        exports[chat_id] = path
+    return exports
+
+def list_chats(chat_dir=CHAT_DIR):
+    """The chat ids that have a shard in chat_dir, sorted."""
+    if not os.path.isdir(chat_dir):
+        return []
+    return sorted(
+        name[:-len(SHARD_SUFFIX)] for name in os.listdir(chat_dir)
+        if name.endswith(SHARD_SUFFIX) and os.path.isfile(os.path.join(chat_dir, name))
+    )
@@ -3,62 +3,194 @@ import pandas as pd
 import sqlite3
 import plotly.express as px
 from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-from collections import Counter
-import emoji
-import re
 import numpy as np
+import io
+import logging
+from functools import lru_cache, partial
+
+from search import to_fts_query
+from metrics import registry
+from instrumentation import Timings, timed, configure_logging
+from engine import matching_report, report_covers
+from chats import CHAT_DIR, list_chats, shard_path
+from datasource import (
+    DB_FILE, MESSAGE_COLUMNS, data_version, read_messages, read_senders, read_date_bounds, read_rollup,
+    read_token_counts, read_emoji_counts, read_time_bounds, read_first_messages, filter_conditions, build_metric_data,
+)
 
 # Pagina Configuratie
 st.set_page_config(page_title="WhatsApp Statistieken", layout="wide", page_icon="🦁")
+# Metingen als JSON-regels op stderr (CHAT_STATS_LOG_LEVEL=WARNING zet ze uit)
+configure_logging()
 
 # --- DATA LADEN ---
-@st.cache_data
-def load_data():
+# Het lezen zelf staat in datasource.py; hier alleen de Streamlit-caches eromheen.
+# Elke loader krijgt het databasebestand van de gekozen chat mee. data_version zit
+# in elke cache-sleutel, zodat een nieuwe import alles ververst.
+def get_data_version(db_file):
+    return data_version(db_file)
+
+# Elke cache is begrensd, zodat ook tientallen chats niet allemaal in het geheugen blijven.
+# Per selectie (berichten, tellingen, zoekresultaten), over alle chats samen:
+DATA_CACHE_ENTRIES = 8
+# Per chat (deelnemers, periode, rollup, rapport): de laatst geopende chats
+CHAT_CACHE_ENTRIES = 16
+
+@st.cache_data(max_entries=DATA_CACHE_ENTRIES)
+def load_data(db_file, data_version, users=None, start_date=None, end_date=None, columns=MESSAGE_COLUMNS, with_features=True):
+    """Laadt alleen de gevraagde kolommen van de berichten die door de filters komen (snapshot of SQLite)."""
     try:
-        conn = sqlite3.connect('chat_data.db')
-        query = "SELECT * FROM messages"
-        df = pd.read_sql_query(query, conn)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        conn.close()
-        return df
+        return read_messages(db_file, users, start_date, end_date, columns, with_features)
     except Exception as e:
         st.error(f"Kan database niet laden. Foutmelding: {e}")
         return pd.DataFrame()
 
+@st.cache_data(max_entries=DATA_CACHE_ENTRIES)
+def search_messages(db_file, data_version, search_query, users, start_date, end_date, page=1, page_size=50):
+    """
+    Zoekt via de FTS5-index, beste treffers eerst. Geeft (resultaten, totaal) terug,
+    of None als de database nog geen zoekindex heeft.
+    """
+    fts_query = to_fts_query(search_query)
+    if fts_query is None:
+        return pd.DataFrame(columns=['timestamp', 'sender', 'message_content']), 0
+
+    conditions, params = filter_conditions(users, start_date, end_date, table='m')
+    where = " AND ".join(["messages_fts MATCH ?"] + conditions)
+    from_clause = f"FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid WHERE {where}"
+    try:
+        conn = sqlite3.connect(db_file)
+        total = conn.execute(f"SELECT COUNT(*) {from_clause}", [fts_query] + params).fetchone()[0]
+        results = pd.read_sql_query(
+            f"""SELECT m.timestamp, m.sender, highlight(messages_fts, 0, '«', '»') AS message_content
+                {from_clause} ORDER BY rank LIMIT ? OFFSET ?""",
+            conn, params=[fts_query] + params + [page_size, (page - 1) * page_size]
+        )
+        conn.close()
+    except sqlite3.OperationalError:
+        return None
+    results['timestamp'] = pd.to_datetime(results['timestamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    return results, total
+
+@st.cache_data(max_entries=DATA_CACHE_ENTRIES)
+def load_token_counts(db_file, data_version, users, start_date, end_date):
+    """Woordtellingen (sender, token, count); None als de tokenindex er niet is."""
+    return read_token_counts(db_file, users, start_date, end_date, load_date_bounds(db_file, data_version))
+
+@st.cache_data(max_entries=DATA_CACHE_ENTRIES)
+def load_emoji_counts(db_file, data_version, users, start_date, end_date):
+    """Emoji-tellingen (sender, emoji, count); None zonder emoji-tabellen."""
+    return read_emoji_counts(db_file, users, start_date, end_date, load_date_bounds(db_file, data_version))
+
+@st.cache_data(max_entries=DATA_CACHE_ENTRIES)
+def load_time_bounds(db_file, data_version, users, start_date, end_date):
+    """Eerste en laatste bericht in de selectie, uit de index (zonder berichten te laden)."""
+    return read_time_bounds(db_file, users, start_date, end_date)
+
+@st.cache_data(max_entries=DATA_CACHE_ENTRIES)
+def load_first_messages(db_file, data_version, users, start_date, end_date, limit=100):
+    """De eerste berichten van de selectie voor het archief, met LIMIT in SQLite."""
+    return read_first_messages(db_file, users, start_date, end_date, limit)
+
+@st.cache_data(max_entries=CHAT_CACHE_ENTRIES)
+def load_senders(db_file, data_version):
+    """Alle deelnemers in volgorde van hun eerste bericht, zonder 'System'."""
+    try:
+        return read_senders(db_file)
+    except Exception as e:
+        st.error(f"Kan database niet laden. Foutmelding: {e}")
+        return []
+
+@st.cache_data(max_entries=CHAT_CACHE_ENTRIES)
+def load_date_bounds(db_file, data_version):
+    return read_date_bounds(db_file)
+
+@st.cache_data(max_entries=CHAT_CACHE_ENTRIES)
+def load_rollup(db_file, data_version):
+    """Voorgeaggregeerde tellingen per (datum, afzender, uur), bijgehouden door de parser."""
+    return read_rollup(db_file)
+
+# Gerenderde woordenwolken die in het geheugen blijven (één per selectie)
+WORDCLOUD_CACHE_ENTRIES = 32
+
+@st.cache_data(max_entries=WORDCLOUD_CACHE_ENTRIES)
+def render_wordcloud(data_version, users, start_date, end_date, _data):
+    """
+    Woordenwolk als PNG, uit de al gefilterde woordtellingen. De selectie is de
+    cache-sleutel; _data wordt niet gehasht en alleen gebruikt bij een cache miss.
+    """
+    wc = WordCloud(width=800, height=400, background_color='white')
+    wc.generate_from_frequencies(registry.get('word_frequencies', _data))
+    png = io.BytesIO()
+    wc.to_image().save(png, format='PNG')
+    return png.getvalue()
+
+@st.cache_resource(max_entries=CHAT_CACHE_ENTRIES)
+def load_report(db_file, data_version):
+    """Voorberekend rapport (engine.py) als het bij deze database hoort, anders None. Gedeeld, niet aanpassen."""
+    return matching_report(db_file)
+
+def memory_usage_mb(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
 # --- HULP FUNCTIES ---
-def extract_emojis(text):
-    return [c for c in text if c in emoji.EMOJI_DATA]
-
-def count_unique_words(text_series):
-    all_text = " ".join(text_series.dropna().astype(str)).lower()
-    words = re.findall(r'\b\w+\b', all_text)
-    return len(set(words))
-
-def get_streak(dates):
-    if len(dates) == 0: return 0
-    dates = sorted(list(set(dates)))
-    longest_streak = 0
-    current_streak = 1
-    for i in range(1, len(dates)):
-        if (dates[i] - dates[i-1]).days == 1:
-            current_streak += 1
-        else:
-            longest_streak = max(longest_streak, current_streak)
-            current_streak = 1
-    return max(longest_streak, current_streak)
+@lru_cache(maxsize=None)
+def warn_not_lazy():
+    # Eén keer per proces: zonder key/on_change wordt elke tab bij elke rerun berekend
+    logging.getLogger('whatsapp_stats.dashboard').warning(
+        "Streamlit %s kent geen key/on_change voor tabs en expanders: alle tabs worden steeds berekend. "
+        "Installeer streamlit>=1.65 (Python 3.10+).", st.__version__
+    )
+
+def lazy_tabs(labels, key):
+    """Tabs die bijhouden welke open staat, zodat alleen die tab wordt berekend."""
+    try:
+        return st.tabs(labels, key=key, on_change='rerun')
+    except TypeError:
+        # Oudere Streamlit: alle tabs worden altijd gerenderd
+        warn_not_lazy()
+        return st.tabs(labels)
+
+def lazy_expander(label, key):
+    try:
+        return st.expander(label, key=key, on_change='rerun')
+    except TypeError:
+        warn_not_lazy()
+        return st.expander(label)
+
+def is_open(container):
+    # None betekent dat Streamlit het niet bijhoudt: dan gewoon renderen
+    return getattr(container, 'open', None) is not False
+
+def select_database():
+    """
+    Met een chats-map (parser.py --input-dir) kies je één chat en wordt alleen
+    die database geopend. Zonder chats-map: gewoon chat_data.db.
+    """
+    chat_ids = list_chats(CHAT_DIR)
+    if not chat_ids:
+        return DB_FILE
+    # ?chat=<id> in de URL opent meteen die chat (handig als link per groep).
+    # Alleen bij het openen (of als de gekozen chat weg is): daarna bepaalt de keuze in de sidebar de URL.
+    if st.session_state.get('chat') not in chat_ids:
+        requested = st.query_params.get('chat')
+        st.session_state['chat'] = requested if requested in chat_ids else chat_ids[0]
+    chat_id = st.sidebar.selectbox("💬 Chat", chat_ids, key='chat')
+    st.query_params['chat'] = chat_id
+    return shard_path(chat_id, CHAT_DIR)
 
 def main():
     st.title("🦁 Het Grote WhatsApp Dashboard")
-    df = load_data()
+    db_file = select_database()
+    data_version = get_data_version(db_file)
 
-    if df.empty:
+    # --- DEELNEMERS (SYSTEM STAAT ER AL NIET IN) ---
+    all_users = load_senders(db_file, data_version)
+
+    if not all_users:
         st.warning("Geen data gevonden. Draai eerst het parser-script.")
         return
 
-    # --- FILTER SYSTEM ERUIT ---
-    df = df[df['sender'] != 'System']
-
     # --- SIDEBAR & FILTERS ---
     st.sidebar.header("⚙️ Instellingen")
     
@@ -70,310 +202,342 @@ def main():
     is_relative = view_mode == "Relatief (% van eigen berichten)"
     
     # 2. GEBRUIKERS FILTER
-    users = st.sidebar.multiselect("Selecteer Deelnemers", df['sender'].unique(), default=df['sender'].unique())
-    df_filtered = df[df['sender'].isin(users)].copy()
-    
-    # Pre-calculate totals
-    user_totals_dict = df_filtered['sender'].value_counts().to_dict()
-    total_group_msgs = len(df_filtered)
+    users = st.sidebar.multiselect("Selecteer Deelnemers", all_users, default=all_users)
+
+    # 3. PERIODE FILTER
+    first_date, last_date = load_date_bounds(db_file, data_version)
+    period = st.sidebar.date_input("Periode", value=(first_date, last_date), min_value=first_date, max_value=last_date)
+    # Tijdens het kiezen van een bereik geeft Streamlit tijdelijk maar één datum terug
+    start_date, end_date = (period[0], period[-1]) if period else (first_date, last_date)
+
+    if not users:
+        st.info("Selecteer minstens één deelnemer.")
+        return
+
+    # Data wordt pas geladen als een statistiek die nog niet in de cache zit erom vraagt,
+    # en dan alleen de kolommen die nodig zijn (de tekst alleen voor het archief).
+    # Zelfde opbouw als datasource.metric_data, maar met de gecachte loaders.
+    data = build_metric_data(
+        data_version, users, start_date, end_date,
+        partial(load_data, db_file, data_version),
+        # Tellingen komen uit de kleine rollup-tabel i.p.v. alle berichten
+        partial(load_rollup, db_file, data_version),
+        # Woordtellingen voor woordenschat, vloekwoorden en woordenwolk
+        partial(load_token_counts, db_file, data_version),
+        partial(load_emoji_counts, db_file, data_version),
+        partial(load_time_bounds, db_file, data_version),
+    )
+
+    # Voorberekend rapport gebruiken als het precies deze selectie dekt (standaard: iedereen, hele periode)
+    report = load_report(db_file, data_version)
+    if report is not None and report_covers(report, users, start_date, end_date):
+        for name, value in report['metrics'].items():
+            registry.put(name, data, value)
+        st.sidebar.caption(f"📦 Voorberekend rapport van {report['meta']['generated_at']}")
+
+    # 4. PRESTATIES (optioneel)
+    show_timings = st.sidebar.checkbox("🐞 Prestaties tonen", help="Tijd (en geheugen) per statistiek en grafiek van deze rerun")
+    trace_memory = show_timings and st.sidebar.checkbox("Geheugen meten (trager)")
+
+    with Timings(trace_memory=trace_memory) as timings:
+        with timed('rerun', 'tabs'):
+            render_tabs(data, db_file, data_version, users, start_date, end_date, is_relative)
+
+    # Alleen als deze rerun de berichten echt heeft geladen
+    loaded = [getattr(data, name) for name in ('messages', 'texts') if data.is_loaded(name)]
+    if loaded:
+        memory_mb = sum(memory_usage_mb(df) for df in loaded)
+        st.sidebar.caption(f"💾 Geheugen data: {memory_mb:.1f} MB ({len(loaded[0])} berichten)")
+
+    if show_timings:
+        render_timings(timings)
+
+def render_timings(timings):
+    """Debugpaneel: alle metingen van deze rerun, traagste eerst."""
+    records = pd.DataFrame(timings.records)
+    with st.sidebar.expander("🐞 Prestaties", expanded=True):
+        if records.empty:
+            st.caption("Niets gemeten.")
+            return
+        metrics = records[records['kind'] == 'metric']
+        computed = int((~metrics['cached'].astype(bool)).sum()) if not metrics.empty else 0
+        st.caption(
+            f"Rerun {timings.run_id}: {timings.total_seconds('rerun'):.3f}s, "
+            f"{computed} statistieken berekend, {len(metrics) - computed} uit cache"
+        )
+        columns = [col for col in ('kind', 'name', 'seconds', 'cached', 'alloc_kb', 'peak_kb') if col in records]
+        st.dataframe(records[columns].sort_values('seconds', ascending=False), use_container_width=True, hide_index=True)
+
+def render_tabs(data, db_file, data_version, users, start_date, end_date, is_relative):
+    def metric(name):
+        return registry.get(name, data)
 
     # --- TABS INDELING ---
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = lazy_tabs([
         "📈 Overzicht", 
         "🧪 Het Lab", 
         "🧠 Gedragsanalyse", 
         "🎉 De Feestzone", 
         "🔍 Archief"
-    ])
+    ], key='active_tab')
 
     # Hulpfunctie voor grafieken
     def render_chart(data, x_col, y_col, title, color_scale='Viridis', orientation='h', force_absolute=False, explanation=None, custom_relative_label=None):
-        df_chart = data.copy()
-        label = "Aantal"
-        text_format = ".0f"
+        with timed('chart', title):
+            df_chart = data.copy()
+            label = "Aantal"
+            text_format = ".0f"
+
+            if is_relative and not force_absolute:
+                user_totals_dict = metric('user_totals')
 
-        if is_relative and not force_absolute:
-            def calculate_percentage(row):
-                user_total = user_totals_dict.get(row['User'], 1)
-                if user_total == 0: return 0
-                return (row['Value'] / user_total) * 100
+                def calculate_percentage(row):
+                    user_total = user_totals_dict.get(row['User'], 1)
+                    if user_total == 0: return 0
+                    return (row['Value'] / user_total) * 100
 
-            df_chart['Value'] = df_chart.apply(calculate_percentage, axis=1)
-            label = custom_relative_label if custom_relative_label else "% van eigen berichten"
-            text_format = ".1f"
+                df_chart['Value'] = df_chart.apply(calculate_percentage, axis=1)
+                label = custom_relative_label if custom_relative_label else "% van eigen berichten"
+                text_format = ".1f"
 
-        height = max(350, len(df_chart) * 30)
+            height = max(350, len(df_chart) * 30)
         
-        fig = px.bar(df_chart, x='Value', y='User', orientation=orientation, 
-                     title=title, color='Value', color_continuous_scale=color_scale,
-                     labels={'Value': label}, text_auto=text_format)
+            fig = px.bar(df_chart, x='Value', y='User', orientation=orientation, 
+                         title=title, color='Value', color_continuous_scale=color_scale,
+                         labels={'Value': label}, text_auto=text_format)
         
-        fig.update_layout(yaxis={'categoryorder':'total ascending'}, height=height)
-        st.plotly_chart(fig, use_container_width=True)
+            fig.update_layout(yaxis={'categoryorder':'total ascending'}, height=height)
+            st.plotly_chart(fig, use_container_width=True)
         
-        if explanation:
-            st.caption(f"ℹ️ {explanation}")
+            if explanation:
+                st.caption(f"ℹ️ {explanation}")
 
     # === TAB 1: OVERZICHT ===
     with tab1:
-        c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Totaal Berichten", df_filtered.shape[0])
-        c2.metric("Polls Aangemaakt", df_filtered['is_poll'].sum())
-        c3.metric("Media Gedeeld", df_filtered['has_media'].sum())
-        days_active = (df_filtered['timestamp'].max() - df_filtered['timestamp'].min()).days
-        c4.metric("Dagen Actief", days_active if days_active > 0 else 1)
-        st.markdown("---")
-        col_left, col_right = st.columns([2, 1])
-        with col_left:
-            st.subheader("Activiteit over tijd")
-            df_filtered['date_only'] = df_filtered['timestamp'].dt.date
-            daily = df_filtered.groupby('date_only').size().reset_index(name='count')
-            fig_line = px.line(daily, x='date_only', y='count', markers=True, labels={'date_only': 'Datum', 'count': 'Berichten'})
-            st.plotly_chart(fig_line, use_container_width=True)
-        with col_right:
-            st.subheader("De Ranglijst")
-            top_users = df_filtered['sender'].value_counts().reset_index()
-            top_users.columns = ['User', 'Value']
-            lbl = "Aantal berichten"
-            if is_relative:
-                top_users['Value'] = (top_users['Value'] / total_group_msgs) * 100
-                lbl = "% Marktaandeel"
-            fig_bar = px.bar(top_users, x='Value', y='User', orientation='h', color='Value', labels={'Value': lbl}, text_auto='.0f')
-            fig_bar.update_layout(yaxis={'categoryorder':'total ascending'})
-            st.plotly_chart(fig_bar, use_container_width=True)
-            st.caption("ℹ️ Simpelweg: wie heeft de meeste berichten gestuurd in deze selectie?")
+        if is_open(tab1):
+            totals = metric('overview_totals')
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Totaal Berichten", totals['messages'])
+            c2.metric("Polls Aangemaakt", totals['polls'])
+            c3.metric("Media Gedeeld", totals['media'])
+            c4.metric("Dagen Actief", totals['days_active'])
+            st.markdown("---")
+            col_left, col_right = st.columns([2, 1])
+            with col_left:
+                st.subheader("Activiteit over tijd")
+                daily = metric('daily_activity')
+                with timed('chart', 'Activiteit over tijd'):
+                    fig_line = px.line(daily, x='date', y='count', markers=True, labels={'date': 'Datum', 'count': 'Berichten'})
+                    st.plotly_chart(fig_line, use_container_width=True)
+            with col_right:
+                st.subheader("De Ranglijst")
+                top_users = metric('ranking')
+                with timed('chart', 'De Ranglijst'):
+                    lbl = "Aantal berichten"
+                    if is_relative:
+                        top_users = top_users.assign(Value=top_users['Value'] / totals['messages'] * 100)
+                        lbl = "% Marktaandeel"
+                    fig_bar = px.bar(top_users, x='Value', y='User', orientation='h', color='Value', labels={'Value': lbl}, text_auto='.0f')
+                    fig_bar.update_layout(yaxis={'categoryorder':'total ascending'})
+                    st.plotly_chart(fig_bar, use_container_width=True)
+                st.caption("ℹ️ Simpelweg: wie heeft de meeste berichten gestuurd in deze selectie?")
 
     # === TAB 2: HET LAB ===
     with tab2:
-        st.markdown("### 🧪 Experimentele Statistieken")
-        
-        # Data berekeningen
-        df_filtered['prev_sender'] = df_filtered['sender'].shift(1)
-        double_texts = df_filtered[df_filtered['sender'] == df_filtered['prev_sender']].groupby('sender').size().reset_index(name='Value')
-        double_texts.columns = ['User', 'Value']
-        
-        night_msgs = df_filtered[(df_filtered['timestamp'].dt.hour >= 0) & (df_filtered['timestamp'].dt.hour < 6)]
-        night_counts = night_msgs['sender'].value_counts().reset_index(name='Value')
-        night_counts.columns = ['User', 'Value']
-
-        questions = df_filtered[df_filtered['message_content'].str.contains(r'\?', na=False)]
-        q_counts = questions['sender'].value_counts().reset_index(name='Value')
-        q_counts.columns = ['User', 'Value']
-
-        shouts = df_filtered[df_filtered['message_content'].str.match(r'^[^a-z]*[A-Z]{3,}[^a-z]*$', na=False)]
-        shout_counts = shouts['sender'].value_counts().reset_index(name='Value')
-        shout_counts.columns = ['User', 'Value']
-
-        links = df_filtered[df_filtered['message_content'].str.contains(r'http|www\.', case=False, na=False)]
-        link_counts = links['sender'].value_counts().reset_index(name='Value')
-        link_counts.columns = ['User', 'Value']
-
-        swear_words_list = [
-            'kut', 'godver', 'tering', 'tyfus', 'kanker', 'kk', 'kkr', 'gvd', 
-            'fack', 'fuck', 'shit', 'verdomme', 'lul', 'pik', 'eikel', 'slet', 
-            'hoer', 'flikker', 'mongool', 'debiel', 'teringlijer', 'hufter'
-        ]
-        swear_pattern = r'|'.join([r'\b' + w for w in swear_words_list]) + r'|kut|kanker|tering'
-        swears = df_filtered[df_filtered['message_content'].str.contains(swear_pattern, case=False, na=False)]
-        swear_counts = swears['sender'].value_counts().reset_index(name='Value')
-        swear_counts.columns = ['User', 'Value']
-
-        df_speed = df_filtered.sort_values('timestamp').copy()
-        df_speed['time_diff'] = df_speed['timestamp'].diff().dt.total_seconds()
-        speed_msgs = df_speed[(df_speed['sender'] != df_speed['prev_sender']) & (df_speed['time_diff'] < 14400) & (df_speed['time_diff'] > 0)]
-        avg_speed = speed_msgs.groupby('sender')['time_diff'].mean().reset_index(name='Value')
-        avg_speed.columns = ['User', 'Value']
-        avg_speed['Value'] = avg_speed['Value'] / 60 
-
-        negatives = df_filtered[df_filtered['message_content'].str.contains(r'\b(nee|niet|geen|nooit|nopes|niks)\b', case=False, na=False)]
-        neg_counts = negatives['sender'].value_counts().reset_index(name='Value')
-        neg_counts.columns = ['User', 'Value']
-
-        streak_data = []
-        for user in users:
-            user_dates = df_filtered[df_filtered['sender'] == user]['timestamp'].dt.date.tolist()
-            streak = get_streak(user_dates)
-            streak_data.append({'User': user, 'Value': streak})
-        streak_df = pd.DataFrame(streak_data)
-        streak_df = streak_df.sort_values('Value', ascending=True)
-
-        # --- GRID LAYOUT ---
-        c1, c2 = st.columns(2)
-        with c1: render_chart(
-            double_texts, 'Value', 'User', "👯 De Dubbele Texter", "Purp",
-            explanation="Aantal keren dat iemand 2+ berichten achter elkaar stuurde zonder onderbreking."
-        )
-        with c2: render_chart(
-            night_counts, 'Value', 'User', "🦉 De Nachtdienst", "Magma",
-            explanation="Berichten verstuurd tussen 00:00 en 06:00 's nachts."
-        )
+        if is_open(tab2):
+            st.markdown("### 🧪 Experimentele Statistieken")
+
+            # --- GRID LAYOUT ---
+            # Vorige afzender en tussentijd per bericht komen uit message_context;
+            # vraagtekens, hoofdletters, links, scheldwoorden en ontkenningen zijn al
+            # per bericht geteld door de parser (features.py)
+            c1, c2 = st.columns(2)
+            with c1: render_chart(
+                metric('double_texts'), 'Value', 'User', "👯 De Dubbele Texter", "Purp",
+                explanation="Aantal keren dat iemand 2+ berichten achter elkaar stuurde zonder onderbreking."
+            )
+            with c2: render_chart(
+                metric('night_counts'), 'Value', 'User', "🦉 De Nachtdienst", "Magma",
+                explanation="Berichten verstuurd tussen 00:00 en 06:00 's nachts."
+            )
 
-        c3, c4 = st.columns(2)
-        with c3: render_chart(
-            q_counts, 'Value', 'User', "❓ De Vragensteller", "Teal",
-            explanation="Aantal berichten met een vraagteken (?)."
-        )
-        with c4: render_chart(
-            shout_counts, 'Value', 'User', "📢 De Schreeuwer", "Reds",
-            explanation="Berichten die volledig in HOOFDLETTERS zijn geschreven."
-        )
+            c3, c4 = st.columns(2)
+            with c3: render_chart(
+                metric('question_counts'), 'Value', 'User', "❓ De Vragensteller", "Teal",
+                explanation="Aantal berichten met een vraagteken (?)."
+            )
+            with c4: render_chart(
+                metric('shout_counts'), 'Value', 'User', "📢 De Schreeuwer", "Reds",
+                explanation="Berichten die volledig in HOOFDLETTERS zijn geschreven."
+            )
 
-        c5, c6 = st.columns(2)
-        with c5: render_chart(
-            link_counts, 'Value', 'User', "🔗 De Linkstrooier", "Blues",
-            explanation="Berichten die een webadres (http/www) bevatten."
-        )
-        with c6: 
-            render_chart(
-                swear_counts, 'Value', 'User', "🤬 De Vloekpot", "Oranges",
-                explanation="Berichten met scheldwoorden (kut, kk, gvd, etc.)."
+            c5, c6 = st.columns(2)
+            with c5: render_chart(
+                metric('link_counts'), 'Value', 'User', "🔗 De Linkstrooier", "Blues",
+                explanation="Berichten die een webadres (http/www) bevatten."
+            )
+            with c6: 
+                render_chart(
+                    metric('swear_counts'), 'Value', 'User', "🤬 De Vloekpot", "Oranges",
+                    explanation="Berichten met scheldwoorden (kut, kk, gvd, etc.)."
+                )
+                swear_check = lazy_expander("Woordenlijst check", key='swear_check')
+                with swear_check:
+                    top_swears = metric('top_swears') if is_open(swear_check) else None
+                    if top_swears:
+                        st.write("**Top 5 gebruikt:**")
+                        st.write(pd.DataFrame(top_swears, columns=['Woord', 'Aantal']))
+
+            c7, c8 = st.columns(2)
+            with c7: 
+                avg_speed_sorted = metric('reply_speed').sort_values('Value', ascending=False)
+                with timed('chart', 'De Snelheidsduivel'):
+                    fig_speed = px.bar(avg_speed_sorted, x='Value', y='User', orientation='h', 
+                                       title="⚡ De Snelheidsduivel (Snelste bovenaan)", color='Value', color_continuous_scale='RdYlGn_r')
+                    st.plotly_chart(fig_speed, use_container_width=True)
+                with st.expander("ℹ️ Uitleg formule"):
+                    st.write("Gemiddelde tijd in minuten tussen een vorig bericht en jouw reactie (binnen 4 uur). Zelf-reacties tellen niet.")
+                    
+            with c8: render_chart(
+                metric('negative_counts'), 'Value', 'User', "📉 De Negativiteits-index", "Gray",
+                explanation="Berichten met ontkennende woorden zoals 'nee', 'niet', 'geen'."
             )
-            with st.expander("Woordenlijst check"):
-                all_text_blob = " ".join(df_filtered['message_content'].dropna().astype(str)).lower()
-                matches = re.findall(swear_pattern, all_text_blob)
-                if matches:
-                    top_swears = Counter(matches).most_common(5)
-                    st.write("**Top 5 gebruikt:**")
-                    st.write(pd.DataFrame(top_swears, columns=['Woord', 'Aantal']))
-
-        c7, c8 = st.columns(2)
-        with c7: 
-            avg_speed_sorted = avg_speed.sort_values('Value', ascending=False)
-            fig_speed = px.bar(avg_speed_sorted, x='Value', y='User', orientation='h', 
-                               title="⚡ De Snelheidsduivel (Snelste bovenaan)", color='Value', color_continuous_scale='RdYlGn_r')
-            st.plotly_chart(fig_speed, use_container_width=True)
-            with st.expander("ℹ️ Uitleg formule"):
-                st.write("Gemiddelde tijd in minuten tussen een vorig bericht en jouw reactie (binnen 4 uur). Zelf-reacties tellen niet.")
-                
-        with c8: render_chart(
-            neg_counts, 'Value', 'User', "📉 De Negativiteits-index", "Gray",
-            explanation="Berichten met ontkennende woorden zoals 'nee', 'niet', 'geen'."
-        )
 
-        c9, c10 = st.columns(2)
-        with c9: 
-            fig_streak = px.bar(streak_df, x='Value', y='User', orientation='h', 
-                                title="🔥 Langste 'Streak' (Dagen)", color='Value', color_continuous_scale='Hot', labels={'Value': 'Dagen'})
-            st.plotly_chart(fig_streak, use_container_width=True)
-            st.caption("ℹ️ Maximaal aantal dagen achter elkaar dat iemand iets in de groep zei.")
-        with c10:
-            st.empty()
+            streaks = metric('streaks')
+            streak_df = pd.DataFrame({'User': users, 'Value': streaks['longest_streak'].to_numpy()})
+            streak_df = streak_df.sort_values('Value', ascending=True)
+            silence_df = pd.DataFrame({'User': users, 'Value': streaks['longest_silence'].to_numpy()})
+            silence_df = silence_df.sort_values('Value', ascending=True)
+
+            c9, c10 = st.columns(2)
+            with c9: 
+                with timed('chart', 'Langste Streak'):
+                    fig_streak = px.bar(streak_df, x='Value', y='User', orientation='h', 
+                                        title="🔥 Langste 'Streak' (Dagen)", color='Value', color_continuous_scale='Hot', labels={'Value': 'Dagen'})
+                    st.plotly_chart(fig_streak, use_container_width=True)
+                st.caption("ℹ️ Maximaal aantal dagen achter elkaar dat iemand iets in de groep zei.")
+                st.caption(f"🏆 Langste groepsstreak: {metric('group_streak')} dagen op rij dat er iemand iets zei.")
+            with c10:
+                with timed('chart', 'Langste Stilte'):
+                    fig_silence = px.bar(silence_df, x='Value', y='User', orientation='h',
+                                         title="😴 Langste Stilte (Dagen)", color='Value', color_continuous_scale='Blues', labels={'Value': 'Dagen'})
+                    st.plotly_chart(fig_silence, use_container_width=True)
+                with st.expander("ℹ️ Huidige streaks"):
+                    current = streaks['current_streak']
+                    st.write(current[current > 0].sort_values(ascending=False).rename('Dagen').rename_axis('Deelnemer'))
+                    st.caption("Streaks die op de laatste dag van de selectie nog liepen.")
 
     # === TAB 3: DIEPTE ANALYSE ===
     with tab3:
-        col_a1, col_a2 = st.columns(2)
-        with col_a1:
-            st.subheader("👻 De Reanimator")
-            df_sorted = df_filtered.sort_values('timestamp')
-            df_sorted['time_diff_obj'] = df_sorted['timestamp'].diff()
-            revivals = df_sorted[df_sorted['time_diff_obj'] > pd.Timedelta(hours=6)]
-            if not revivals.empty:
-                reviver_counts = revivals['sender'].value_counts().reset_index(name='Value')
-                reviver_counts.columns = ['User', 'Value']
+        if is_open(tab3):
+            col_a1, col_a2 = st.columns(2)
+            with col_a1:
+                st.subheader("👻 De Reanimator")
+                reviver_counts = metric('revival_counts')
+                if not reviver_counts.empty:
+                    render_chart(
+                        reviver_counts, 'Value', 'User', "Aantal Reanimaties", "Purples",
+                        explanation="Berichten gestuurd nadat het 6+ uur stil was."
+                    )
+                else: st.info("Geen stiltes gevonden.")
+
+            with col_a2:
+                st.subheader("🍻 Weekend Strijders")
                 render_chart(
-                    reviver_counts, 'Value', 'User', "Aantal Reanimaties", "Purples",
-                    explanation="Berichten gestuurd nadat het 6+ uur stil was."
+                    metric('weekend_counts'), 'Value', 'User', "Berichten in het weekend", "Inferno",
+                    explanation="Aantal berichten op Zaterdag of Zondag."
                 )
-            else: st.info("Geen stiltes gevonden.")
-
-        with col_a2:
-            st.subheader("🍻 Weekend Strijders")
-            df_filtered['is_weekend'] = df_filtered['timestamp'].dt.dayofweek >= 5
-            weekend_counts = df_filtered[df_filtered['is_weekend'] == True]['sender'].value_counts().reset_index(name='Value')
-            weekend_counts.columns = ['User', 'Value']
-            render_chart(
-                weekend_counts, 'Value', 'User', "Berichten in het weekend", "Inferno",
-                explanation="Aantal berichten op Zaterdag of Zondag."
-            )
 
-        st.markdown("---")
-        col_a3, col_a4 = st.columns(2)
-        with col_a3:
-            st.subheader("📏 De Spraakwaterval")
-            # 1. Berekenen
-            df_filtered['word_count'] = df_filtered['message_content'].apply(lambda x: len(str(x).split()))
-            avg_len = df_filtered.groupby('sender')['word_count'].mean().reset_index()
-            avg_len.columns = ['User', 'Value']
-            
-            # 2. SORTEREN (Nieuwe toevoeging)
-            avg_len = avg_len.sort_values('Value', ascending=True)
-
-            fig_len = px.bar(avg_len, x='Value', y='User', orientation='h', color='Value', color_continuous_scale='Teal', labels={'Value': 'Woorden'})
-            st.plotly_chart(fig_len, use_container_width=True)
-            with st.expander("ℹ️ Wat betekent dit?"):
-                st.write("""
-                **Gemiddeld aantal woorden per bericht.**
-                * Dit is altijd een absoluut gemiddelde, de Relatief-knop heeft hier geen invloed op.
-                * Een hoog cijfer betekent dat iemand vaak lange teksten typt.
-                """)
-
-        with col_a4:
-            st.subheader("🧠 De Woordenschat")
-            vocab_data = []
-            for user in users:
-                user_msgs = df_filtered[df_filtered['sender'] == user]['message_content']
-                # Bereken uniek vs totaal
-                all_text_str = " ".join(user_msgs.dropna().astype(str)).lower()
-                all_words = re.findall(r'\b\w+\b', all_text_str)
-                total_word_count = len(all_words)
-                unique_word_count = len(set(all_words))
-                vocab_data.append({'User': user, 'Value': unique_word_count, 'TotalWords': total_word_count})
-            
-            vocab_df = pd.DataFrame(vocab_data)
-            
-            # 3. LOGICA VOOR WOORDENSCHAT (Nieuwe toevoeging)
-            if is_relative:
-                # Relatief: Unieke woorden PER bericht (of per 100 woorden, maar we doen hier score)
-                # We gebruiken de bestaande render_chart die deelt door Aantal Berichten.
-                # Unieke woorden / Aantal Berichten = "Nieuwe woorden per keer dat je iets zegt"
-                # Dit is een maatstaf voor diversiteit.
-                render_chart(
-                    vocab_df, 'Value', 'User', "Woordenschat Diversiteit", "Viridis", force_absolute=False,
-                    custom_relative_label="Unieke woorden per bericht",
-                    explanation="In de relatieve modus delen we het aantal unieke woorden door jouw totaal aantal berichten. Een hoge score betekent dat je heel gevarieerd praat en niet steeds hetzelfde zegt."
-                )
-            else:
-                # Absoluut: Gewoon wie de meeste woorden kent
-                render_chart(
-                    vocab_df, 'Value', 'User', "Totaal Unieke Woorden", "Viridis", force_absolute=True,
-                    explanation="Het totaal aantal woorden dat jij hebt gebruikt die je nog niet eerder had gebruikt. Natuurlijk wint degene met de meeste berichten hier vaak."
-                )
+            st.markdown("---")
+            col_a3, col_a4 = st.columns(2)
+            with col_a3:
+                st.subheader("📏 De Spraakwaterval")
+                # Gemiddelde, al gesorteerd
+                avg_len = metric('avg_words')
+
+                with timed('chart', 'De Spraakwaterval'):
+                    fig_len = px.bar(avg_len, x='Value', y='User', orientation='h', color='Value', color_continuous_scale='Teal', labels={'Value': 'Woorden'})
+                    st.plotly_chart(fig_len, use_container_width=True)
+                with st.expander("ℹ️ Wat betekent dit?"):
+                    st.write("""
+                    **Gemiddeld aantal woorden per bericht.**
+                    * Dit is altijd een absoluut gemiddelde, de Relatief-knop heeft hier geen invloed op.
+                    * Een hoog cijfer betekent dat iemand vaak lange teksten typt.
+                    """)
+
+            with col_a4:
+                st.subheader("🧠 De Woordenschat")
+                # Uniek vs totaal, rechtstreeks uit de woordtellingen
+                vocab_df = metric('vocabulary')
+                
+                # 3. LOGICA VOOR WOORDENSCHAT (Nieuwe toevoeging)
+                if is_relative:
+                    # Relatief: Unieke woorden PER bericht (of per 100 woorden, maar we doen hier score)
+                    # We gebruiken de bestaande render_chart die deelt door Aantal Berichten.
+                    # Unieke woorden / Aantal Berichten = "Nieuwe woorden per keer dat je iets zegt"
+                    # Dit is een maatstaf voor diversiteit.
+                    render_chart(
+                        vocab_df, 'Value', 'User', "Woordenschat Diversiteit", "Viridis", force_absolute=False,
+                        custom_relative_label="Unieke woorden per bericht",
+                        explanation="In de relatieve modus delen we het aantal unieke woorden door jouw totaal aantal berichten. Een hoge score betekent dat je heel gevarieerd praat en niet steeds hetzelfde zegt."
+                    )
+                else:
+                    # Absoluut: Gewoon wie de meeste woorden kent
+                    render_chart(
+                        vocab_df, 'Value', 'User', "Totaal Unieke Woorden", "Viridis", force_absolute=True,
+                        explanation="Het totaal aantal woorden dat jij hebt gebruikt die je nog niet eerder had gebruikt. Natuurlijk wint degene met de meeste berichten hier vaak."
+                    )
 
     # === TAB 4: FEESTZONE ===
     with tab4:
-        col_f1, col_f2 = st.columns(2)
-        with col_f1:
-            st.subheader("☁️ Woordenwolk")
-            stopwords = set(['de', 'het', 'een', 'en', 'is', 'dat', 'van', 'ik', 'te', 'niet', 'op', 'voor', 'media', 'omitted', 'in', 'je', 'met', 'als', 'die', 'zijn', 'maar', 'heb', 'er', 'aan', 'om', 'dan'])
-            text_content = " ".join(df_filtered['message_content'].dropna().astype(str))
-            try:
-                wc = WordCloud(width=800, height=400, background_color ='white', stopwords=stopwords).generate(text_content)
-                fig_wc, ax = plt.subplots()
-                ax.imshow(wc, interpolation='bilinear')
-                ax.axis("off")
-                st.pyplot(fig_wc)
-                st.caption("De meest gebruikte woorden in de chat (groot = vaak gebruikt).")
-            except ValueError: st.info("Niet genoeg tekst.")
-        with col_f2:
-            st.subheader("😂 Emoji Analyse")
-            all_emojis_list = []
-            for msg in df_filtered['message_content'].dropna():
-                all_emojis_list.extend(extract_emojis(msg))
-            if all_emojis_list:
-                emoji_counts = Counter(all_emojis_list).most_common(10)
-                emoji_df = pd.DataFrame(emoji_counts, columns=['Emoji', 'Count'])
-                fig_emoji = px.pie(emoji_df, names='Emoji', values='Count', hole=0.3)
-                st.plotly_chart(fig_emoji, use_container_width=True)
-                st.caption("De 10 meest gebruikte emoji's.")
+        if is_open(tab4):
+            col_f1, col_f2 = st.columns(2)
+            with col_f1:
+                st.subheader("☁️ Woordenwolk")
+                try:
+                    with timed('chart', 'Woordenwolk'):
+                        st.image(render_wordcloud(data_version, tuple(users), start_date, end_date, data), use_container_width=True)
+                    st.caption("De meest gebruikte woorden in de chat (groot = vaak gebruikt).")
+                except ValueError: st.info("Niet genoeg tekst.")
+            with col_f2:
+                st.subheader("😂 Emoji Analyse")
+                emoji_df = metric('top_emojis')
+                if not emoji_df.empty:
+                    with timed('chart', 'Emoji Analyse'):
+                        fig_emoji = px.pie(emoji_df, names='Emoji', values='Count', hole=0.3)
+                        st.plotly_chart(fig_emoji, use_container_width=True)
+                    st.caption("De 10 meest gebruikte emoji's.")
 
     # === TAB 5: ARCHIEF ===
     with tab5:
-        search_query = st.text_input("Zoek in berichten")
-        if search_query:
-            results = df_filtered[df_filtered['message_content'].str.contains(search_query, case=False, na=False)]
-            st.dataframe(results[['timestamp', 'sender', 'message_content']].sort_values(by='timestamp', ascending=False), use_container_width=True)
-        else:
-            st.dataframe(df_filtered[['timestamp', 'sender', 'message_content']].head(100), use_container_width=True)
+        if is_open(tab5):
+            search_query = st.text_input("Zoek in berichten")
+            if search_query:
+                page_size = 50
+                # Nieuwe zoekopdracht begint weer op pagina 1
+                if st.session_state.get('search_for') != search_query:
+                    st.session_state['search_for'] = search_query
+                    st.session_state['search_page'] = 1
+                page = st.session_state.get('search_page', 1)
+                found = search_messages(db_file, data_version, search_query, tuple(users), start_date, end_date, page, page_size)
+                if found is not None and page > 1 and (page - 1) * page_size >= found[1]:
+                    # Filters zijn aangepast en deze pagina bestaat niet meer
+                    page = st.session_state['search_page'] = 1
+                    found = search_messages(db_file, data_version, search_query, tuple(users), start_date, end_date, page, page_size)
+                if found is None:
+                    # Oude database zonder zoekindex: letterlijk zoeken in de geladen berichten
+                    df_filtered = data.texts
+                    results = df_filtered[df_filtered['message_content'].str.contains(search_query, case=False, regex=False, na=False)]
+                    st.dataframe(results[['timestamp', 'sender', 'message_content']].sort_values(by='timestamp', ascending=False), use_container_width=True)
+                else:
+                    results, total = found
+                    pages = max(1, -(-total // page_size))
+                    st.caption(f"{total} treffers, beste eerst. Zoektermen staan tussen « ».")
+                    st.dataframe(results, use_container_width=True)
+                    if pages > 1:
+                        st.number_input("Pagina", min_value=1, max_value=pages, key='search_page')
+            else:
+                st.dataframe(load_first_messages(db_file, data_version, tuple(users), start_date, end_date), use_container_width=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
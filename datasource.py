@@ -0,0 +1,311 @@
+"""
+Reading a chat database into the frames the metrics work on, without Streamlit.
+
+The dashboard wraps these readers in st.cache_data; the benchmark and other
+headless tools use them directly, usually through metric_data. Every reader
+takes the database path, so one process can work on several chats.
+
+Databases from older parser versions lack some derived tables; the readers
+then either return None / an empty frame, or compute the same columns from the
+messages themselves (add_features, add_context, rollup_from_frame, ...).
+"""
+import os
+import sqlite3
+from collections import Counter
+from functools import partial
+
+import pandas as pd
+
+from features import FEATURE_COLUMNS, extract_features
+from frames import compact_frame, mark_double_texts
+from tokens import tokenize
+from emojis import find_emojis
+from metrics import MetricData
+from snapshot import read_snapshot
+
+DB_FILE = 'chat_data.db'
+# Message columns read by default (no id / content_hash); the metrics need fewer (metrics.METRIC_COLUMNS)
+MESSAGE_COLUMNS = ('timestamp', 'sender', 'message_content', 'has_media', 'is_poll')
+# Previous sender and time since the previous message, stored per message by the parser
+CONTEXT_COLUMNS = ('prev_sender', 'gap_seconds')
+
+def data_version(db_file=DB_FILE):
+    """
+    Changes with every ingest. Part of every cache key, so nothing computed
+    from an older version (or another database) is reused.
+    """
+    try:
+        stat = os.stat(db_file)
+    except OSError:
+        return None
+    return db_file, stat.st_mtime_ns, stat.st_size
+
+def read_messages(db_file=DB_FILE, users=None, start_date=None, end_date=None, columns=MESSAGE_COLUMNS,
+                  with_features=True):
+    """
+    The given columns of the messages that pass the filters, in export order,
+    plus their features and context when with_features is set. From the
+    snapshot (snapshot.py) when it matches the database, otherwise filtered in SQLite.
+    """
+    columns = list(columns)
+    extra = FEATURE_COLUMNS + list(CONTEXT_COLUMNS) if with_features else []
+    snapshot = read_snapshot(db_file, users, start_date, end_date, columns + extra)
+    if snapshot is not None:
+        return compact_frame(snapshot)
+
+    conn = sqlite3.connect(db_file)
+    try:
+        try:
+            query, params = build_message_query(columns, users, start_date, end_date, with_features=with_features)
+            return compact_frame(pd.read_sql_query(query, conn, params=params))
+        except pd.errors.DatabaseError:
+            # Database from an older parser: compute features and context here,
+            # which needs the text even when it wasn't asked for
+            read_columns = columns if 'message_content' in columns else columns + ['message_content']
+            query, params = build_message_query(read_columns, users, start_date, end_date)
+            df = add_context(compact_frame(add_features(pd.read_sql_query(query, conn, params=params))))
+            return df if 'message_content' in columns else df.drop(columns='message_content')
+    finally:
+        conn.close()
+
+def read_first_messages(db_file, users=None, start_date=None, end_date=None, limit=100):
+    """The first 'limit' messages of the selection (timestamp, sender, text), read with LIMIT in SQLite."""
+    query, params = build_message_query(('timestamp', 'sender', 'message_content'), users, start_date, end_date)
+    conn = sqlite3.connect(db_file)
+    try:
+        return compact_frame(pd.read_sql_query(query + " LIMIT ?", conn, params=params + [limit]))
+    finally:
+        conn.close()
+
+def filter_conditions(users=None, start_date=None, end_date=None, table='messages'):
+    """Turns the user/date filters into SQL conditions with parameters (uses the sender/timestamp indexes)."""
+    conditions = []
+    params = []
+    if users is not None:
+        conditions.append(f"{table}.sender IN ({', '.join('?' * len(users))})")
+        params.extend(users)
+    if start_date is not None:
+        conditions.append(f"{table}.timestamp >= ?")
+        params.append(start_date.strftime('%Y-%m-%d'))
+    if end_date is not None:
+        # The end date is inclusive: everything before the start of the next day
+        conditions.append(f"{table}.timestamp < ?")
+        params.append((end_date + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+    return conditions, params
+
+def build_message_query(columns, users=None, start_date=None, end_date=None, with_features=False):
+    conditions, params = filter_conditions(users, start_date, end_date)
+    selected = [f"messages.{col}" for col in columns]
+    if with_features:
+        # Per-message features and context the parser already computed
+        selected += [f"f.{col}" for col in FEATURE_COLUMNS]
+        selected += [f"c.{col}" for col in CONTEXT_COLUMNS]
+    query = f"SELECT {', '.join(selected)} FROM messages"
+    if with_features:
+        query += " LEFT JOIN message_features f ON f.id = messages.id"
+        query += " LEFT JOIN message_context c ON c.id = messages.id"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    # Keep the export order (double texts look at the previous message)
+    query += " ORDER BY messages.id"
+    return query, params
+
+def add_context(df):
+    """Same columns as message_context, but only within the loaded messages."""
+    df['prev_sender'] = df['sender'].astype(object).shift(1)
+    df['gap_seconds'] = df['timestamp'].diff().dt.total_seconds()
+    return mark_double_texts(df)
+
+def add_features(df):
+    values = [extract_features(text) for text in df['message_content']]
+    features = pd.DataFrame(values, columns=FEATURE_COLUMNS, index=df.index)
+    return pd.concat([df, features], axis=1)
+
+def read_token_counts(db_file, users, start_date, end_date, date_bounds):
+    """
+    Word counts (sender, token, count) from the parser's token index.
+    Part of the period needs token_counts_daily; None if the index isn't there.
+    """
+    first_date, last_date = date_bounds
+    placeholders = ', '.join('?' * len(users))
+    if start_date <= first_date and end_date >= last_date:
+        query = f"SELECT sender, token, count FROM token_counts WHERE sender IN ({placeholders})"
+        params = list(users)
+    else:
+        query = f"""SELECT sender, token, SUM(count) AS count FROM token_counts_daily
+                    WHERE sender IN ({placeholders}) AND date >= ? AND date <= ?
+                    GROUP BY sender, token"""
+        params = list(users) + [start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')]
+    conn = sqlite3.connect(db_file)
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    except pd.errors.DatabaseError:
+        return None
+    finally:
+        conn.close()
+
+def read_emoji_counts(db_file, users, start_date, end_date, date_bounds):
+    """
+    Emoji counts (sender, emoji, count) as stored by the parser.
+    Whole period: totals per sender, otherwise the per-message counts. None without emoji tables.
+    """
+    first_date, last_date = date_bounds
+    if start_date <= first_date and end_date >= last_date:
+        query = f"SELECT sender, emoji, count FROM emoji_counts WHERE sender IN ({', '.join('?' * len(users))})"
+        params = list(users)
+    else:
+        conditions, params = filter_conditions(users, start_date, end_date, table='m')
+        query = f"""SELECT m.sender, e.emoji, SUM(e.count) AS count
+                    FROM message_emojis e JOIN messages m ON m.id = e.id
+                    WHERE {' AND '.join(conditions)}
+                    GROUP BY m.sender, e.emoji"""
+    conn = sqlite3.connect(db_file)
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    except pd.errors.DatabaseError:
+        return None
+    finally:
+        conn.close()
+
+def emoji_counts_from_frame(df):
+    """Same shape as read_emoji_counts, but counted from the loaded messages."""
+    counts = Counter()
+    for sender, text in zip(df['sender'], df['message_content']):
+        if isinstance(text, str):
+            for found in find_emojis(text):
+                counts[(sender, found)] += 1
+    return pd.DataFrame([(s, e, c) for (s, e), c in counts.items()], columns=['sender', 'emoji', 'count'])
+
+def token_counts_from_frame(df):
+    """Same shape as read_token_counts, but counted from the loaded messages."""
+    counts = Counter()
+    for sender, text in zip(df['sender'], df['message_content']):
+        if isinstance(text, str):
+            for token in tokenize(text):
+                counts[(sender, token)] += 1
+    return pd.DataFrame([(s, t, c) for (s, t), c in counts.items()], columns=['sender', 'token', 'count'])
+
+def read_senders(db_file=DB_FILE):
+    """All participants in order of their first message, without 'System'."""
+    conn = sqlite3.connect(db_file)
+    try:
+        rows = conn.execute(
+            "SELECT sender FROM messages WHERE sender != 'System' GROUP BY sender ORDER BY MIN(id)"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+def read_time_bounds(db_file, users, start_date, end_date):
+    """
+    Times of the first and last message in the selection, (None, None) if there
+    are none. Answered from the (sender, timestamp) index.
+    """
+    conditions, params = filter_conditions(users, start_date, end_date)
+    conn = sqlite3.connect(db_file)
+    try:
+        first, last = conn.execute(
+            f"SELECT MIN(timestamp), MAX(timestamp) FROM messages WHERE {' AND '.join(conditions)}", params
+        ).fetchone()
+    finally:
+        conn.close()
+    if first is None:
+        return None, None
+    return pd.Timestamp(first), pd.Timestamp(last)
+
+def read_date_bounds(db_file=DB_FILE):
+    conn = sqlite3.connect(db_file)
+    first, last = conn.execute("SELECT MIN(timestamp), MAX(timestamp) FROM messages").fetchone()
+    conn.close()
+    return pd.Timestamp(first).date(), pd.Timestamp(last).date()
+
+def read_rollup(db_file=DB_FILE):
+    """Pre-aggregated counts per (date, sender, hour), kept up to date by the parser."""
+    try:
+        conn = sqlite3.connect(db_file)
+        query = "SELECT date, sender, hour, weekday, msg_count, media_count, poll_count FROM activity_rollup"
+        rollup = pd.read_sql_query(query, conn)
+        conn.close()
+    except Exception:
+        # Database from an older parser: no rollup table yet
+        return pd.DataFrame()
+    rollup['date'] = pd.to_datetime(rollup['date'], format='%Y-%m-%d', errors='coerce')
+    rollup['sender'] = rollup['sender'].astype('category')
+    return rollup
+
+def rollup_from_frame(df):
+    """Same table as activity_rollup, but computed from the messages themselves."""
+    keys = [df['timestamp'].dt.normalize().rename('date'), df['sender'], df['timestamp'].dt.hour.rename('hour')]
+    rollup = df.groupby(keys, observed=True).agg(
+        msg_count=('sender', 'size'),
+        media_count=('has_media', 'sum'),
+        poll_count=('is_poll', 'sum'),
+    ).reset_index()
+    rollup['weekday'] = rollup['date'].dt.dayofweek
+    return rollup
+
+def filter_rollup(rollup, users, start_date, end_date):
+    return rollup[
+        rollup['sender'].isin(users)
+        & (rollup['date'] >= pd.Timestamp(start_date))
+        & (rollup['date'] <= pd.Timestamp(end_date))
+    ]
+
+def build_metric_data(version, users, start_date, end_date,
+                      read_messages, read_rollup, read_tokens, read_emojis, read_time_bounds):
+    """
+    MetricData for a selection, from readers that are already bound to one
+    database: read_messages(users, start_date, end_date, columns, with_features),
+    read_rollup() for the whole chat, and read_tokens / read_emojis /
+    read_time_bounds(users, start_date, end_date). metric_data passes the plain
+    readers, the dashboard its cached ones.
+
+    For databases from an older parser the rollup, token and emoji counts are
+    computed from the messages instead.
+    """
+    users = tuple(users)
+
+    def load_messages(columns, with_features):
+        return read_messages(users, start_date, end_date, columns, with_features)
+
+    def load_rollup():
+        rollup = read_rollup()
+        if rollup.empty:
+            rollup = rollup_from_frame(data.messages)
+        return filter_rollup(rollup, users, start_date, end_date)
+
+    def load_tokens():
+        token_counts = read_tokens(users, start_date, end_date)
+        return token_counts if token_counts is not None else token_counts_from_frame(data.texts)
+
+    def load_emojis():
+        emoji_counts = read_emojis(users, start_date, end_date)
+        return emoji_counts if emoji_counts is not None else emoji_counts_from_frame(data.texts)
+
+    def load_time_bounds():
+        return read_time_bounds(users, start_date, end_date)
+
+    data = MetricData(
+        (version, users, start_date, end_date), users,
+        load_messages, load_rollup, load_tokens, load_emojis, load_time_bounds
+    )
+    return data
+
+def metric_data(db_file=DB_FILE, users=None, start_date=None, end_date=None):
+    """
+    MetricData for a selection, read straight from the database (no caching
+    besides the metric registry itself). Defaults: all participants, whole period.
+    """
+    users = read_senders(db_file) if users is None else list(users)
+    date_bounds = read_date_bounds(db_file)
+    start_date = date_bounds[0] if start_date is None else start_date
+    end_date = date_bounds[1] if end_date is None else end_date
+
+    return build_metric_data(
+        data_version(db_file), users, start_date, end_date,
+        partial(read_messages, db_file),
+        partial(read_rollup, db_file),
+        partial(read_token_counts, db_file, date_bounds=date_bounds),
+        partial(read_emoji_counts, db_file, date_bounds=date_bounds),
+        partial(read_time_bounds, db_file),
+    )
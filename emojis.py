@@ -0,0 +1,139 @@
+"""
+Emoji counting, done once at ingest.
+
+Emoji are matched as whole sequences: skin tones, ZWJ families and flags count
+as one emoji instead of being split into their code points. The matcher is a
+trie over emoji.EMOJI_DATA: a regex character class finds where an emoji can
+start, and the trie walk from there takes the longest sequence that is a known emoji.
+Every match is stored in its fully-qualified form, so '❤' and '❤️' (with or
+without the U+FE0F variation selector) are the same emoji.
+
+message_emojis stores the counts per message, emoji_counts the totals per sender.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+import emoji
+
+_END = ''
+_VARIATION_SELECTOR = '\ufe0f'
+
+@lru_cache(maxsize=None)
+def _matcher():
+    trie = {}
+    for key in emoji.EMOJI_DATA:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[_END] = True
+
+    # Character ranges instead of single characters: sre checks a list of
+    # hundreds of astral code points one by one, ranges are a lot cheaper
+    ranges = []
+    for code_point in sorted(ord(char) for char in trie):
+        if ranges and code_point == ranges[-1][1] + 1:
+            ranges[-1][1] = code_point
+        else:
+            ranges.append([code_point, code_point])
+    char_class = ''.join(
+        re.escape(chr(low)) if low == high else f'{re.escape(chr(low))}-{re.escape(chr(high))}'
+        for low, high in ranges
+    )
+    return trie, re.compile(f'[{char_class}]')
+
+@lru_cache(maxsize=None)
+def _qualified_forms():
+    # Every spelling without variation selectors -> the fully-qualified emoji
+    forms = {}
+    for key, data in emoji.EMOJI_DATA.items():
+        if data['status'] == emoji.STATUS['fully_qualified']:
+            forms[key.replace(_VARIATION_SELECTOR, '')] = key
+    return forms
+
+def normalize_emoji(found):
+    """The fully-qualified form of an emoji (unchanged if it has none)."""
+    return _qualified_forms().get(found.replace(_VARIATION_SELECTOR, ''), found)
+
+def find_emojis(text):
+    """
+    Returns all emoji in the text, in order, as whole fully-qualified sequences.
+    """
+    if not text:
+        return []
+    trie, start_pattern = _matcher()
+    found = []
+    position = 0
+    length = len(text)
+
+    while True:
+        match = start_pattern.search(text, position)
+        if match is None:
+            return found
+
+        start = match.start()
+        node = trie
+        index = start
+        end = 0
+        while index < length:
+            node = node.get(text[index])
+            if node is None:
+                break
+            index += 1
+            if _END in node:
+                end = index
+
+        if end:
+            found.append(normalize_emoji(text[start:end]))
+            position = end
+        else:
+            position = start + 1
+
+def create_emoji_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS message_emojis (
+            id INTEGER,
+            emoji TEXT,
+            count INTEGER,
+            PRIMARY KEY (id, emoji)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS emoji_counts (
+            sender TEXT,
+            emoji TEXT,
+            count INTEGER,
+            PRIMARY KEY (sender, emoji)
+        ) WITHOUT ROWID
+    ''')
+
+def update_message_emojis(cursor, after_id):
+    """
+    Counts the emoji in the messages with id > after_id.
+    """
+    rows = cursor.connection.execute(
+        'SELECT id, message_content FROM messages WHERE id > ?', (after_id,)
+    )
+    cursor.executemany(
+        'INSERT OR REPLACE INTO message_emojis (id, emoji, count) VALUES (?, ?, ?)',
+        (
+            (message_id, found, count)
+            for message_id, text in rows
+            for found, count in Counter(find_emojis(text)).items()
+        )
+    )
+
+def update_emoji_counts(cursor, after_id):
+    """
+    Adds the per-message counts with id > after_id to the per-sender totals.
+    Runs after update_message_emojis.
+    """
+    cursor.execute('''
+        INSERT INTO emoji_counts (sender, emoji, count)
+        SELECT m.sender, e.emoji, SUM(e.count)
+        FROM message_emojis e
+        JOIN messages m ON m.id = e.id
+        WHERE e.id > ?
+        GROUP BY m.sender, e.emoji
+        ON CONFLICT (sender, emoji) DO UPDATE SET count = count + excluded.count
+    ''', (after_id,))
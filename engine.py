@@ -0,0 +1,219 @@
+"""
+Headless stats engine: computes the full metric report for a chat database.
+
+Every metric in the registry (metrics.py) runs against the same selection,
+by default all participants over the whole period. With --workers > 1 the
+metrics are spread over a process pool. Each worker builds its own MetricData
+and loads only the frames its metrics need; with a snapshot (snapshot.py)
+next to the database those are read from the memory-mapped file instead of
+queried from SQLite, but every worker still holds its own copy.
+
+The report is written as JSON (one file) or Parquet (a directory with one
+file per metric plus meta.json). It records the database version it was
+computed from. The dashboard shows a matching report instead of computing
+the default selection itself, which is what makes nightly precomputation
+worthwhile for very large chats:
+
+    python engine.py chat_data.db --workers 4            # chat_data.report.json
+    python engine.py chat_data.db --format parquet       # chat_data.report/
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from datasource import DB_FILE, metric_data
+from metrics import registry
+from snapshot import database_version
+
+REPORT_FORMATS = ('json', 'parquet')
+
+# Set in every pool worker by _init_worker
+_worker_data = None
+
+def report_path(db_file, fmt='json'):
+    stem = os.path.splitext(db_file)[0]
+    return f'{stem}.report.json' if fmt == 'json' else f'{stem}.report'
+
+def _init_worker(db_file, users, start_date, end_date):
+    global _worker_data
+    _worker_data = metric_data(db_file, users, start_date, end_date)
+
+def _compute_metric(name):
+    return name, registry.get(name, _worker_data)
+
+def compute_report(db_file=DB_FILE, users=None, start_date=None, end_date=None, metrics=None, workers=1):
+    """
+    Computes the given metrics (default: all) for one selection. Returns
+    {'meta': {...}, 'metrics': {name: value}} with the values exactly as the
+    registry returns them.
+    """
+    names = list(metrics) if metrics else registry.names()
+    unknown = set(names) - set(registry.names())
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(sorted(unknown))}")
+
+    start_time = time.perf_counter()
+    data = metric_data(db_file, users, start_date, end_date)
+    _, users, start_date, end_date = data.key
+
+    if workers > 1:
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(db_file, list(users), start_date, end_date)) as pool:
+            values = dict(pool.imap_unordered(_compute_metric, names))
+    else:
+        values = {name: registry.get(name, data) for name in names}
+
+    conn = sqlite3.connect(db_file)
+    try:
+        db_version = database_version(conn)
+    finally:
+        conn.close()
+
+    meta = {
+        'db_file': os.path.basename(db_file),
+        'db_version': db_version,
+        'users': list(users),
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'seconds': round(time.perf_counter() - start_time, 3),
+        'metrics': names,
+    }
+    return {'meta': meta, 'metrics': {name: values[name] for name in names}}
+
+def encode_value(value):
+    """
+    Turns a metric value into (kind, DataFrame), so every metric can be stored
+    as a table. decode_value reverses it.
+    """
+    if isinstance(value, pd.DataFrame):
+        if value.index.name is not None:
+            return 'indexed', value.reset_index()
+        return 'frame', value.reset_index(drop=True)
+    if isinstance(value, dict):
+        return 'mapping', pd.DataFrame({'key': list(value.keys()), 'value': list(value.values())})
+    if isinstance(value, list):
+        return 'pairs', pd.DataFrame(value, columns=['key', 'value'])
+    return 'scalar', pd.DataFrame({'value': [value]})
+
+def decode_value(kind, frame):
+    if kind == 'indexed':
+        return frame.set_index(frame.columns[0])
+    if kind == 'frame':
+        return frame
+    if kind == 'mapping':
+        return {key: _plain(value) for key, value in zip(frame['key'], frame['value'])}
+    if kind == 'pairs':
+        return [(key, _plain(value)) for key, value in zip(frame['key'], frame['value'])]
+    return _plain(frame['value'].iloc[0])
+
+def _plain(value):
+    # numpy scalars back to Python ones (int, float)
+    return value.item() if hasattr(value, 'item') else value
+
+def write_report(report, path, fmt='json'):
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+
+    if fmt == 'json':
+        metrics = {}
+        for name, value in report['metrics'].items():
+            kind, frame = encode_value(value)
+            # orient='table' keeps the dtypes (dates, categories) for the way back
+            table = frame.to_json(orient='table', index=False, double_precision=15)
+            metrics[name] = {'kind': kind, 'table': json.loads(table)}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'meta': report['meta'], 'metrics': metrics}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return
+
+    os.makedirs(path, exist_ok=True)
+    for name, value in report['metrics'].items():
+        kind, frame = encode_value(value)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'kind': kind.encode()})
+        pq.write_table(table, os.path.join(path, f'{name}.parquet'))
+    # meta.json last: a report directory without it is incomplete
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(report['meta'], f, ensure_ascii=False)
+
+def load_report(path):
+    """
+    Reads a report written by write_report (JSON file or Parquet directory).
+    Returns None if there is none.
+    """
+    if os.path.isdir(path):
+        meta_file = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file, encoding='utf-8') as f:
+            meta = json.load(f)
+        metrics = {}
+        for name in meta['metrics']:
+            table = pq.read_table(os.path.join(path, f'{name}.parquet'))
+            metrics[name] = decode_value(table.schema.metadata[b'kind'].decode(), table.to_pandas())
+        return {'meta': meta, 'metrics': metrics}
+
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        stored = json.load(f)
+    metrics = {
+        name: decode_value(entry['kind'], pd.read_json(io.StringIO(json.dumps(entry['table'])), orient='table'))
+        for name, entry in stored['metrics'].items()
+    }
+    return {'meta': stored['meta'], 'metrics': metrics}
+
+def matching_report(db_file=DB_FILE):
+    """
+    The report next to db_file (JSON or Parquet), if it was computed from the
+    database as it is now. None otherwise.
+    """
+    conn = sqlite3.connect(db_file)
+    try:
+        db_version = database_version(conn)
+    finally:
+        conn.close()
+
+    for fmt in REPORT_FORMATS:
+        report = load_report(report_path(db_file, fmt))
+        if report is not None and report['meta'].get('db_version') == db_version:
+            return report
+    return None
+
+def report_covers(report, users, start_date, end_date):
+    """True if the report was computed for exactly this selection."""
+    meta = report['meta']
+    return (
+        meta['users'] == list(users)
+        and meta['start_date'] == start_date.isoformat()
+        and meta['end_date'] == end_date.isoformat()
+    )
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compute the full stats report for a chat database.")
+    arg_parser.add_argument('db_file', nargs='?', default=DB_FILE)
+    arg_parser.add_argument('--output', default=None, help="Defaults to <db>.report.json or <db>.report/")
+    arg_parser.add_argument('--format', choices=REPORT_FORMATS, default='json')
+    arg_parser.add_argument('--workers', type=int, default=1, help="Compute the metrics in this many processes")
+    arg_parser.add_argument('--metrics', nargs='+', default=None, help="Only these metrics (default: all)")
+    arg_parser.add_argument('--users', nargs='+', default=None, help="Only these participants (default: all)")
+    arg_parser.add_argument('--start', type=date.fromisoformat, default=None, help="First day, YYYY-MM-DD")
+    arg_parser.add_argument('--end', type=date.fromisoformat, default=None, help="Last day, YYYY-MM-DD")
+    args = arg_parser.parse_args()
+
+    output = args.output or report_path(args.db_file, args.format)
+    report = compute_report(args.db_file, users=args.users, start_date=args.start, end_date=args.end,
+                            metrics=args.metrics, workers=args.workers)
+    write_report(report, output, args.format)
+    print(f"Report written ({len(report['metrics'])} metrics in {report['meta']['seconds']:.2f}s) to {output}")
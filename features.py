@@ -0,0 +1,62 @@
+"""
+Per-message lexical features for the Het Lab and Gedragsanalyse tabs.
+
+Every message is scanned once, at ingest, and the results are stored as
+integer/flag columns in message_features (keyed on messages.id). The dashboard
+then only has to sum or average these columns per sender.
+"""
+import re
+
+SWEAR_WORDS = [
+    'kut', 'godver', 'tering', 'tyfus', 'kanker', 'kk', 'kkr', 'gvd',
+    'fack', 'fuck', 'shit', 'verdomme', 'lul', 'pik', 'eikel', 'slet',
+    'hoer', 'flikker', 'mongool', 'debiel', 'teringlijer', 'hufter'
+]
+swear_pattern = re.compile(r'|'.join([r'\b' + w for w in SWEAR_WORDS]) + r'|kut|kanker|tering')
+shout_pattern = re.compile(r'^[^a-z]*[A-Z]{3,}[^a-z]*$')
+link_pattern = re.compile(r'http|www\.', re.IGNORECASE)
+negative_pattern = re.compile(r'\b(nee|niet|geen|nooit|nopes|niks)\b', re.IGNORECASE)
+
+FEATURE_COLUMNS = ['word_count', 'has_question', 'is_shout', 'has_link', 'swear_count', 'is_negative']
+
+def extract_features(text):
+    """
+    Returns the FEATURE_COLUMNS values for one message, in that order.
+    """
+    if not text:
+        return (0, 0, 0, 0, 0, 0)
+    return (
+        len(text.split()),
+        int('?' in text),
+        int(shout_pattern.match(text) is not None),
+        int(link_pattern.search(text) is not None),
+        len(swear_pattern.findall(text.lower())),
+        int(negative_pattern.search(text) is not None),
+    )
+
+def create_feature_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS message_features (
+            id INTEGER PRIMARY KEY,
+            word_count INTEGER,
+            has_question INTEGER,
+            is_shout INTEGER,
+            has_link INTEGER,
+            swear_count INTEGER,
+            is_negative INTEGER
+        )
+    ''')
+
+def update_features(cursor, after_id):
+    """
+    Computes the features for the messages with id > after_id.
+    """
+    # Separate cursor, so the rows stream in while executemany writes
+    rows = cursor.connection.execute(
+        'SELECT id, message_content FROM messages WHERE id > ?', (after_id,)
+    )
+    cursor.executemany('''
+        INSERT OR REPLACE INTO message_features
+            (id, word_count, has_question, is_shout, has_link, swear_count, is_negative)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', ((message_id,) + extract_features(text) for message_id, text in rows))
@@ -0,0 +1,38 @@
+"""
+The column types of a message frame, wherever it was read from.
+
+SQLite hands back text and integers; the snapshot (snapshot.py) is written
+through compact_frame too, so a frame read from either ends up with the same
+dtypes and the metrics never have to care where it came from.
+"""
+import pandas as pd
+
+# Stored as 0/1 by the parser, bool in the frames
+FLAG_COLUMNS = ('has_media', 'is_poll', 'has_question', 'is_shout', 'has_link', 'is_negative')
+COUNT_COLUMNS = ('word_count', 'swear_count')
+
+def compact_frame(df):
+    """Lean dtypes: category for senders, bool for flags, datetime64 for times."""
+    if 'timestamp' in df:
+        # One unit, also for an empty selection (pandas gives those seconds)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce').dt.as_unit('us')
+    if 'sender' in df:
+        df['sender'] = df['sender'].astype('category')
+    if 'message_content' in df:
+        df['message_content'] = df['message_content'].astype('string[pyarrow]')
+    for col in FLAG_COLUMNS:
+        if col in df:
+            df[col] = df[col].fillna(0).astype(bool)
+    for col in COUNT_COLUMNS:
+        if col in df:
+            df[col] = df[col].fillna(0).astype('int32')
+    if 'prev_sender' in df:
+        df = mark_double_texts(df)
+        df['prev_sender'] = df['prev_sender'].astype('category')
+    if 'gap_seconds' in df:
+        df['gap_seconds'] = df['gap_seconds'].astype('float64')
+    return df
+
+def mark_double_texts(df):
+    df['is_double_text'] = df['prev_sender'].to_numpy(dtype=object) == df['sender'].to_numpy(dtype=object)
+    return df
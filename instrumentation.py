@@ -0,0 +1,121 @@
+"""
+Wall time and allocation per metric, data load and chart render.
+
+Code under measurement is wrapped in timed(kind, name). Every measurement is
+emitted as one JSON log line on the 'whatsapp_stats.timings' logger and, while a
+Timings recorder is active in the current context (one dashboard rerun), also
+collected there for the debug panel.
+
+Time is always measured. Allocation (net growth and peak above the start, via
+tracemalloc) only while tracemalloc is tracing: Timings(trace_memory=True)
+switches it on for its duration, or set PYTHONTRACEMALLOC to trace the whole
+process. Nested measurements (a chart computing a metric) each get their own
+peak, and the outer one still sees the inner peaks.
+"""
+import contextvars
+import itertools
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger('whatsapp_stats.timings')
+
+_recorder = contextvars.ContextVar('timings_recorder', default=None)
+_stack = contextvars.ContextVar('timings_stack', default=())
+_run_ids = itertools.count(1)
+
+def configure_logging(level=None):
+    """
+    Sends the timing lines to stderr, one JSON object per line. Level from
+    CHAT_STATS_LOG_LEVEL (default INFO; WARNING silences them).
+    """
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(level or os.environ.get('CHAT_STATS_LOG_LEVEL', 'INFO'))
+    logger.propagate = False
+
+class Timings:
+    """
+    Collects the measurements of one run (a dashboard rerun, a batch job).
+    Use as a context manager; the records are dicts as logged.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.run_id = next(_run_ids)
+        self.trace_memory = trace_memory
+        self.records = []
+        self._token = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        self._token = _recorder.set(self)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        _recorder.reset(self._token)
+        return False
+
+    def total_seconds(self, kind=None):
+        return sum(r['seconds'] for r in self.records if kind is None or r['kind'] == kind)
+
+class _Frame:
+    __slots__ = ('inner_peak',)
+
+    def __init__(self):
+        self.inner_peak = 0
+
+@contextmanager
+def timed(kind, name, **fields):
+    """
+    Measures the block as one (kind, name) record. Extra fields (cached=True,
+    rows=...) are added to the record as is; the block can add more through the
+    dict it gets.
+    """
+    recorder = _recorder.get()
+    tracing = tracemalloc.is_tracing()
+    parent_stack = _stack.get()
+    frame = _Frame()
+
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if parent_stack:
+            parent_stack[-1].inner_peak = max(parent_stack[-1].inner_peak, peak)
+        tracemalloc.reset_peak()
+        mem_before = current
+    token = _stack.set(parent_stack + (frame,))
+
+    extra = dict(fields)
+    start = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        seconds = time.perf_counter() - start
+        _stack.reset(token)
+
+        record = {'event': 'timing', 'kind': kind, 'name': name, 'seconds': round(seconds, 6)}
+        if tracing and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame.inner_peak)
+            if parent_stack:
+                parent_stack[-1].inner_peak = max(parent_stack[-1].inner_peak, peak)
+            record['alloc_kb'] = round((current - mem_before) / 1024, 1)
+            record['peak_kb'] = round((peak - mem_before) / 1024, 1)
+        record.update(extra)
+        if recorder is not None:
+            record['run'] = recorder.run_id
+            recorder.records.append(record)
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, default=str))
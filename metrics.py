@@ -0,0 +1,281 @@
+"""
+The dashboard statistics as named, memoized metrics.
+
+Every metric is a function of a MetricData: the selection (data version,
+participants, period) plus loaders for the frames it may need. MetricRegistry.get
+computes a metric only the first time it is asked for a selection and keeps the
+result in a bounded LRU cache, shared by all sessions of the process. Frames are
+loaded only when a metric that needs them misses the cache, so a rerun where
+everything is cached doesn't touch the messages at all.
+
+Every lookup and load is measured with instrumentation.timed.
+"""
+import threading
+from collections import Counter, OrderedDict
+from functools import cached_property
+
+import pandas as pd
+
+from features import swear_pattern
+from emojis import normalize_emoji
+from instrumentation import timed
+from streaks import user_streaks, longest_group_run
+
+# Results kept across reruns (all metrics and selections together)
+METRIC_CACHE_SIZE = 512
+
+# Thresholds for the reply-speed and revival charts
+REPLY_WINDOW_SECONDS = 4 * 3600
+REVIVAL_GAP_SECONDS = 6 * 3600
+
+# Message columns the metrics read; the per-message features and context come
+# along. No metric reads the text itself: message_content is only loaded (as
+# MetricData.texts) for databases that lack the search, token or emoji tables.
+METRIC_COLUMNS = ('timestamp', 'sender', 'has_media', 'is_poll')
+TEXT_COLUMNS = ('timestamp', 'sender', 'message_content')
+
+WORDCLOUD_STOPWORDS = {
+    'de', 'het', 'een', 'en', 'is', 'dat', 'van', 'ik', 'te', 'niet', 'op', 'voor', 'media', 'omitted',
+    'in', 'je', 'met', 'als', 'die', 'zijn', 'maar', 'heb', 'er', 'aan', 'om', 'dan'
+}
+
+class MetricData:
+    """
+    The selection a metric is computed for, with lazily loaded inputs.
+    key identifies the selection: (data_version, users, start_date, end_date).
+    The load_* callables return the messages, activity rollup, token counts,
+    emoji counts and (first, last) message time for that selection.
+    load_messages(columns, with_features) returns only the given message
+    columns, plus the features and context when with_features is set.
+    """
+
+    def __init__(self, key, users, load_messages, load_rollup, load_tokens, load_emojis, load_time_bounds):
+        self.key = key
+        self.users = list(users)
+        self._load_messages = load_messages
+        self._load_rollup = load_rollup
+        self._load_tokens = load_tokens
+        self._load_emojis = load_emojis
+        self._load_time_bounds = load_time_bounds
+
+    @cached_property
+    def messages(self):
+        with timed('load', 'messages'):
+            return self._load_messages(METRIC_COLUMNS, True)
+
+    @cached_property
+    def texts(self):
+        with timed('load', 'texts'):
+            return self._load_messages(TEXT_COLUMNS, False)
+
+    @cached_property
+    def rollup(self):
+        with timed('load', 'rollup'):
+            return self._load_rollup()
+
+    @cached_property
+    def tokens(self):
+        with timed('load', 'tokens'):
+            return self._load_tokens()
+
+    @cached_property
+    def emojis(self):
+        with timed('load', 'emojis'):
+            return self._load_emojis()
+
+    @cached_property
+    def time_bounds(self):
+        with timed('load', 'time_bounds'):
+            return self._load_time_bounds()
+
+    def is_loaded(self, name):
+        return name in self.__dict__
+
+class MetricRegistry:
+    def __init__(self, max_entries=METRIC_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._metrics = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def metric(self, name):
+        """Decorator that registers a function as the metric 'name'."""
+        def register(func):
+            self._metrics[name] = func
+            return func
+        return register
+
+    def names(self):
+        return list(self._metrics)
+
+    def get(self, name, data):
+        cache_key = (name,) + tuple(data.key)
+        with timed('metric', name, cached=True) as record:
+            with self._lock:
+                if cache_key in self._cache:
+                    self._cache.move_to_end(cache_key)
+                    return self._cache[cache_key]
+
+            record['cached'] = False
+            value = self._metrics[name](data)
+
+            with self._lock:
+                self._cache[cache_key] = value
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            return value
+
+    def put(self, name, data, value):
+        """Stores a value computed elsewhere (a precomputed report) as the result for data."""
+        cache_key = (name,) + tuple(data.key)
+        with self._lock:
+            self._cache[cache_key] = value
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+registry = MetricRegistry()
+
+# --- HULP FUNCTIES ---
+def count_per_user(data):
+    # value_counts op een categorie geeft ook nullen voor niet-geselecteerde afzenders
+    counts = data['sender'].value_counts()
+    counts = counts[counts > 0].reset_index()
+    counts.columns = ['User', 'Value']
+    return counts
+
+def sum_per_user(data, column='msg_count'):
+    sums = data.groupby('sender', observed=True)[column].sum().sort_values(ascending=False)
+    sums = sums[sums > 0].reset_index()
+    sums.columns = ['User', 'Value']
+    return sums
+
+# --- OVERZICHT ---
+@registry.metric('overview_totals')
+def overview_totals(data):
+    # First and last message from an index lookup, not from the messages themselves
+    first, last = data.time_bounds
+    days_active = (last - first).days if first is not None else 0
+    return {
+        'messages': int(data.rollup['msg_count'].sum()),
+        'polls': int(data.rollup['poll_count'].sum()),
+        'media': int(data.rollup['media_count'].sum()),
+        'days_active': days_active if days_active > 0 else 1,
+    }
+
+@registry.metric('user_totals')
+def user_totals(data):
+    return sum_per_user(data.rollup).set_index('User')['Value'].to_dict()
+
+@registry.metric('daily_activity')
+def daily_activity(data):
+    return data.rollup.groupby('date')['msg_count'].sum().reset_index(name='count')
+
+@registry.metric('ranking')
+def ranking(data):
+    return sum_per_user(data.rollup)
+
+@registry.metric('night_counts')
+def night_counts(data):
+    return sum_per_user(data.rollup[data.rollup['hour'] < 6])
+
+@registry.metric('weekend_counts')
+def weekend_counts(data):
+    return sum_per_user(data.rollup[data.rollup['weekday'] >= 5])
+
+# --- HET LAB ---
+@registry.metric('double_texts')
+def double_texts(data):
+    return sum_per_user(data.messages, 'is_double_text')
+
+@registry.metric('question_counts')
+def question_counts(data):
+    return sum_per_user(data.messages, 'has_question')
+
+@registry.metric('shout_counts')
+def shout_counts(data):
+    return sum_per_user(data.messages, 'is_shout')
+
+@registry.metric('link_counts')
+def link_counts(data):
+    return sum_per_user(data.messages, 'has_link')
+
+@registry.metric('swear_counts')
+def swear_counts(data):
+    return count_per_user(data.messages[data.messages['swear_count'] > 0])
+
+@registry.metric('negative_counts')
+def negative_counts(data):
+    return sum_per_user(data.messages, 'is_negative')
+
+@registry.metric('top_swears')
+def top_swears(data):
+    word_totals = data.tokens.groupby('token')['count'].sum()
+    swear_totals = Counter()
+    for word, count in word_totals.items():
+        for match in swear_pattern.findall(word):
+            swear_totals[match] += count
+    return swear_totals.most_common(5)
+
+@registry.metric('reply_speed')
+def reply_speed(data):
+    messages = data.messages
+    gaps = messages['gap_seconds']
+    replies = messages[~messages['is_double_text'] & (gaps < REPLY_WINDOW_SECONDS) & (gaps > 0)]
+    avg_speed = replies.groupby('sender', observed=True)['gap_seconds'].mean().reset_index(name='Value')
+    avg_speed.columns = ['User', 'Value']
+    avg_speed['Value'] = avg_speed['Value'] / 60
+    return avg_speed
+
+@registry.metric('streaks')
+def streaks(data):
+    # Streaks en stiltes voor iedereen tegelijk, uit de actieve dagen in de rollup
+    return user_streaks(data.rollup[['sender', 'date']]).set_index('sender').reindex(data.users, fill_value=0)
+
+@registry.metric('group_streak')
+def group_streak(data):
+    return longest_group_run(data.rollup)
+
+# --- GEDRAGSANALYSE ---
+@registry.metric('revival_counts')
+def revival_counts(data):
+    return count_per_user(data.messages[data.messages['gap_seconds'] > REVIVAL_GAP_SECONDS])
+
+@registry.metric('avg_words')
+def avg_words(data):
+    avg_len = data.messages.groupby('sender', observed=True)['word_count'].mean().reset_index()
+    avg_len.columns = ['User', 'Value']
+    return avg_len.sort_values('Value', ascending=True)
+
+@registry.metric('vocabulary')
+def vocabulary(data):
+    # Uniek vs totaal, rechtstreeks uit de woordtellingen
+    return (
+        data.tokens.groupby('sender')['count']
+        .agg(Value='size', TotalWords='sum')
+        .reindex(data.users, fill_value=0)
+        .rename_axis('User')
+        .reset_index()
+    )
+
+# --- FEESTZONE ---
+@registry.metric('word_frequencies')
+def word_frequencies(data):
+    word_totals = data.tokens.groupby('token')['count'].sum()
+    # Like WordCloud.generate: no numbers and no one-letter words ('t, 'n, ...)
+    return {
+        word: count for word, count in word_totals.items()
+        if len(word) >= 2 and word not in WORDCLOUD_STOPWORDS and not word.isdigit()
+    }
+
+@registry.metric('top_emojis')
+def top_emojis(data):
+    if data.emojis.empty:
+        return pd.DataFrame(columns=['Emoji', 'Count'])
+    # Databases ingested before emoji were normalized still store '❤' and '❤️' apart
+    top = data.emojis.groupby(data.emojis['emoji'].map(normalize_emoji))['count'].sum().nlargest(10)
+    return pd.DataFrame({'Emoji': top.index, 'Count': top.values})
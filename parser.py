@@ -1,11 +1,163 @@
 import sqlite3
 import re
+import io
+import os
+import hashlib
+import time
+import argparse
+import contextlib
+import multiprocessing
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
 
-def parse_whatsapp_chat(input_file, db_file):
+from rollups import create_rollup_tables, update_rollups
+from search import create_search_index, update_search_index
+from features import create_feature_tables, update_features
+from tokens import create_token_tables, update_token_counts, update_daily_token_counts
+from emojis import create_emoji_tables, update_message_emojis, update_emoji_counts
+from sessions import create_session_tables, set_session_gap, update_message_context, update_sessions
+from snapshot import write_snapshot, snapshot_path
+from chats import CHAT_DIR, find_exports, shard_path
+
+# Regex to identify the start of a new message
+# Format: MM/DD/YY, HH:MM - Sender: Message
+log_pattern = re.compile(r'^(\d{1,2}/\d{1,2}/\d{2}, \d{2}:\d{2}) - (.*)$')
+
+# Number of buffered rows per executemany call in bulk mode
+BULK_BATCH_SIZE = 50000
+
+# Tables derived from 'messages', each kept up to date from its own last processed id.
+# Optional ones (token_counts_daily) are skipped while the table doesn't exist.
+DERIVED_TABLES = [
+    ('activity_rollup', update_rollups),
+    ('messages_fts', update_search_index),
+    ('message_features', update_features),
+    ('token_counts', update_token_counts),
+    ('token_counts_daily', update_daily_token_counts),
+    ('message_emojis', update_message_emojis),
+    ('emoji_counts', update_emoji_counts),
+    ('message_context', update_message_context),
+    ('sessions', update_sessions),
+]
+
+# Upper bound for the byte range one worker parses at a time in parallel mode
+PARALLEL_CHUNK_BYTES = 16 * 1024 * 1024
+# Parsed or in-progress chunks per worker that may wait for the (single) writer
+PARALLEL_CHUNKS_IN_FLIGHT = 2
+
+def parse_whatsapp_chat(input_file, db_file, bulk=False, batch_size=BULK_BATCH_SIZE, incremental=False, workers=1,
+                        daily_tokens=False, session_gap_hours=None, snapshot=False):
     conn = sqlite3.connect(db_file)
     cursor = conn.cursor()
 
+    ensure_schema(cursor, daily_tokens=daily_tokens)
+    if session_gap_hours is not None and set_session_gap(cursor, int(session_gap_hours * 3600)):
+        # Sessions were cut with another gap before: rebuild them from scratch
+        reset_derived_tables(cursor, ['message_context', 'sessions'])
+    conn.commit()
+
+    # Bulk load into a new database: keep the rollback journal in memory and
+    # don't fsync while the messages go in. A crash halfway means re-running the
+    # import, which is fine while the file holds nothing else. Existing databases
+    # (incremental runs, re-ingests) keep their journaling, and so does the
+    # derived-table build below.
+    relaxed = None
+    if bulk and cursor.execute('SELECT 1 FROM messages LIMIT 1').fetchone() is None:
+        relaxed = relax_durability(cursor)
+
+    # Incremental mode: skip everything older than the last ingested message.
+    # Messages in the checkpoint minute itself are re-read and deduplicated
+    # by the (timestamp, sender, content_hash) unique index.
+    checkpoint = load_checkpoint(cursor) if incremental else None
+    checkpoint_seen = False
+    since = checkpoint[0] if checkpoint else None
+    if checkpoint:
+        print(f"Resuming from checkpoint {since}")
+
+    row_count = 0
+    new_count = 0
+    start_time = time.perf_counter()
+
+    try:
+        if workers > 1:
+            entries = iter_entries_parallel(input_file, workers, since=since)
+        else:
+            entries = iter_entries_from_file(input_file, since=since)
+
+        # Single writer: whichever way the file was parsed, rows arrive in file order
+        batch = []
+        for entry in assign_hashes(entries):
+            if checkpoint and (entry['timestamp'], entry['content_hash']) == checkpoint:
+                checkpoint_seen = True
+
+            if bulk:
+                batch.append(entry_to_row(entry))
+                if len(batch) >= batch_size:
+                    new_count += save_batch(cursor, batch)
+                    conn.commit()
+                    row_count += len(batch)
+                    batch = []
+            else:
+                new_count += finalize_and_save(cursor, entry)
+                row_count += 1
+
+        if batch:
+            new_count += save_batch(cursor, batch)
+            row_count += len(batch)
+
+        save_checkpoint(cursor)
+        conn.commit()
+        if relaxed is not None:
+            restore_durability(cursor, relaxed)
+        # The rate covers parsing and inserting the messages only, so bulk and
+        # row-by-row stay comparable; the derived tables are timed on their own
+        elapsed = time.perf_counter() - start_time
+        rate = row_count / elapsed if elapsed > 0 else 0
+        print(f"Database created successfully ({row_count} messages in {elapsed:.2f}s, {rate:.0f} rows/sec)")
+        print(f"{new_count} new, {row_count - new_count} already stored")
+
+        derived_start = time.perf_counter()
+        update_derived_tables(cursor)
+        conn.commit()
+        derived_elapsed = time.perf_counter() - derived_start
+        print(f"Derived tables updated in {derived_elapsed:.2f}s (total {elapsed + derived_elapsed:.2f}s)")
+        if checkpoint and not checkpoint_seen:
+            print("Warning: the last ingested message was not found in this export. Is it the same chat?")
+
+        if snapshot:
+            snapshot_rows = write_snapshot(db_file)
+            print(f"Snapshot written ({snapshot_rows} messages) to {snapshot_path(db_file)}")
+
+    except FileNotFoundError:
+        print(f"Error: The file '{input_file}' was not found.")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        conn.close()
+
+def relax_durability(cursor):
+    """
+    Switches off journaling to disk and fsync. Returns the previous settings for
+    restore_durability.
+    """
+    journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+    synchronous = cursor.execute('PRAGMA synchronous').fetchone()[0]
+    cursor.execute('PRAGMA journal_mode = MEMORY')
+    cursor.execute('PRAGMA synchronous = OFF')
+    cursor.execute('PRAGMA temp_store = MEMORY')
+    cursor.execute('PRAGMA cache_size = -65536')
+    return journal_mode, synchronous
+
+def restore_durability(cursor, settings):
+    journal_mode, synchronous = settings
+    cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+    cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+
+def ensure_schema(cursor, daily_tokens=False):
+    """
+    Creates the tables, and upgrades databases made by older versions of this script.
+    """
     # Updated schema to include 'is_poll'
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS messages (
@@ -14,105 +166,394 @@ def parse_whatsapp_chat(input_file, db_file):
             sender TEXT,
             message_content TEXT,
             has_media INTEGER,
-            is_poll INTEGER
+            is_poll INTEGER,
+            content_hash TEXT
+        )
+    ''')
+
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(messages)')]
+    if 'content_hash' not in columns:
+        cursor.execute('ALTER TABLE messages ADD COLUMN content_hash TEXT')
+        rows = cursor.execute('''
+            SELECT id, timestamp, sender, message_content FROM messages ORDER BY id
+        ''').fetchall()
+        entries = ({'id': r[0], 'timestamp': r[1], 'sender': r[2], 'message_content': r[3]} for r in rows)
+        cursor.executemany(
+            'UPDATE messages SET content_hash = ? WHERE id = ?',
+            ((e['content_hash'], e['id']) for e in assign_hashes(entries))
+        )
+        # Old versions appended the whole export again on every run, so these
+        # databases hold the same messages more than once: keep the first copy
+        cursor.execute('''
+            DELETE FROM messages WHERE id NOT IN (
+                SELECT MIN(id) FROM messages GROUP BY timestamp, sender, content_hash
+            )
+        ''')
+
+    # Dedup key: re-ingesting the same export never stores a message twice
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_dedup
+        ON messages (timestamp, sender, content_hash)
+    ''')
+
+    # Dashboard filters: date ranges use the dedup index (it starts with timestamp),
+    # participant selections use this one
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_sender
+        ON messages (sender, timestamp)
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_checkpoint (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_timestamp TEXT,
+            last_hash TEXT,
+            updated_at TEXT
         )
     ''')
 
-    # Regex to identify the start of a new message
-    # Format: MM/DD/YY, HH:MM - Sender: Message
-    log_pattern = re.compile(r'^(\d{1,2}/\d{1,2}/\d{2}, \d{2}:\d{2}) - (.*)$')
+    # Last message id each derived table has seen. A table without a row here
+    # (new table, or a database from before it existed) gets built from scratch.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS derived_state (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER
+        )
+    ''')
+
+    create_rollup_tables(cursor)
+    create_search_index(cursor)
+    create_feature_tables(cursor)
+    create_token_tables(cursor, daily=daily_tokens)
+    create_emoji_tables(cursor)
+    create_session_tables(cursor)
+
+def update_derived_tables(cursor):
+    """
+    Brings every derived table up to date with the messages added since its last update.
+    """
+    max_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM messages').fetchone()[0]
+
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    for name, update in DERIVED_TABLES:
+        if name not in existing:
+            continue
+
+        row = cursor.execute('SELECT last_id FROM derived_state WHERE name = ?', (name,)).fetchone()
+        last_id = row[0] if row else 0
+        if last_id >= max_id:
+            continue
+
+        update(cursor, last_id)
+        cursor.execute('INSERT OR REPLACE INTO derived_state (name, last_id) VALUES (?, ?)', (name, max_id))
+
+def reset_derived_tables(cursor, names):
+    for name in names:
+        cursor.execute(f'DELETE FROM {name}')
+        cursor.execute('DELETE FROM derived_state WHERE name = ?', (name,))
+
+def load_checkpoint(cursor):
+    row = cursor.execute('SELECT last_timestamp, last_hash FROM ingest_checkpoint WHERE id = 1').fetchone()
+    return tuple(row) if row else None
+
+def save_checkpoint(cursor):
+    """
+    Remembers the newest stored message, so the next incremental run can skip ahead.
+    """
+    cursor.execute('''
+        INSERT OR REPLACE INTO ingest_checkpoint (id, last_timestamp, last_hash, updated_at)
+        SELECT 1, timestamp, content_hash, datetime('now')
+        FROM messages
+        ORDER BY timestamp DESC, id DESC
+        LIMIT 1
+    ''')
 
+def iter_entries(lines, since=None):
+    """
+    Turns raw export lines into message entries, joining multi-line messages.
+    With 'since', messages older than that timestamp are skipped.
+    """
     current_entry = None
-    
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                stripped_line = line.rstrip()
-                
-                if not stripped_line:
-                    continue
-
-                match = log_pattern.match(stripped_line)
-
-                if match:
-                    # Save previous entry before starting new one
-                    if current_entry:
-                        finalize_and_save(cursor, current_entry)
-
-                    # Start new entry
-                    raw_timestamp, content_body = match.groups()
-                    
-                    # Date Parsing
-                    try:
-                        dt_obj = datetime.strptime(raw_timestamp, '%m/%d/%y, %H:%M')
-                        formatted_timestamp = dt_obj.strftime('%Y-%m-%d %H:%M:%S')
-                    except ValueError:
-                        formatted_timestamp = raw_timestamp
-
-                    # Sender Parsing
-                    if ': ' in content_body:
-                        sender, message = content_body.split(': ', 1)
-                    else:
-                        sender = 'System'
-                        message = content_body
-
-                    current_entry = {
-                        'timestamp': formatted_timestamp,
-                        'sender': sender,
-                        'message_content': message,
-                        'has_media': 0,
-                        'is_poll': 0
-                    }
-
-                    # Initial check for flags in the first line
-                    if "<Media omitted>" in message:
-                        current_entry['has_media'] = 1
-                    if "POLL:" in message:
-                        current_entry['is_poll'] = 1
-
-                else:
-                    # Handle Multi-line (Poll options or long text)
-                    if current_entry:
-                        current_entry['message_content'] += '\n' + stripped_line
-                        
-                        # Check flags in continuation lines
-                        if "<Media omitted>" in stripped_line:
-                            current_entry['has_media'] = 1
-                        # WhatsApp exports often put "POLL:" on the first line, 
-                        # but we check here just in case formatting varies.
-                        if "POLL:" in stripped_line:
-                            current_entry['is_poll'] = 1
-                        if stripped_line.strip().startswith("OPTION:"):
-                            current_entry['is_poll'] = 1
-
-            # Save the last entry
+
+    for line in lines:
+        stripped_line = line.rstrip()
+
+        if not stripped_line:
+            continue
+
+        match = log_pattern.match(stripped_line)
+
+        if match:
+            # Hand back previous entry before starting new one
             if current_entry:
-                finalize_and_save(cursor, current_entry)
+                yield current_entry
 
-        conn.commit()
-        print("Database created successfully")
+            # Start new entry
+            raw_timestamp, content_body = match.groups()
 
-    except FileNotFoundError:
-        print(f"Error: The file '{input_file}' was not found.")
-    except Exception as e:
-        print(f"An error occurred: {e}")
-    finally:
-        conn.close()
+            # Date Parsing
+            try:
+                formatted_timestamp = fast_timestamp(raw_timestamp)
+            except ValueError:
+                formatted_timestamp = raw_timestamp
+
+            if since and formatted_timestamp < since:
+                # Already ingested; drop it and its continuation lines
+                current_entry = None
+                continue
+
+            # Sender Parsing
+            if ': ' in content_body:
+                sender, message = content_body.split(': ', 1)
+            else:
+                sender = 'System'
+                message = content_body
+
+            current_entry = {
+                'timestamp': formatted_timestamp,
+                'sender': sender,
+                'message_content': message,
+                'has_media': 0,
+                'is_poll': 0
+            }
+
+            # Initial check for flags in the first line
+            if "<Media omitted>" in message:
+                current_entry['has_media'] = 1
+            if "POLL:" in message:
+                current_entry['is_poll'] = 1
+
+        else:
+            # Handle Multi-line (Poll options or long text)
+            if current_entry:
+                current_entry['message_content'] += '\n' + stripped_line
+
+                # Check flags in continuation lines
+                if "<Media omitted>" in stripped_line:
+                    current_entry['has_media'] = 1
+                # WhatsApp exports often put "POLL:" on the first line,
+                # but we check here just in case formatting varies.
+                if "POLL:" in stripped_line:
+                    current_entry['is_poll'] = 1
+                if stripped_line.strip().startswith("OPTION:"):
+                    current_entry['is_poll'] = 1
+
+    # Hand back the last entry
+    if current_entry:
+        yield current_entry
+
+def iter_entries_from_file(input_file, since=None):
+    with open(input_file, 'r', encoding='utf-8') as f:
+        yield from iter_entries(f, since=since)
+
+def find_chunk_offsets(input_file, chunk_count):
+    """
+    Splits the file into roughly equal byte ranges that each start at the first
+    line of a message, so no message is ever cut in two.
+    """
+    file_size = os.path.getsize(input_file)
+    offsets = [0]
+
+    with open(input_file, 'rb') as f:
+        for i in range(1, chunk_count):
+            target = file_size * i // chunk_count
+            if target <= offsets[-1]:
+                continue
+
+            # Skip the (partial) line we landed in, then walk to the next message start
+            f.seek(target)
+            f.readline()
+            while True:
+                position = f.tell()
+                line = f.readline()
+                if not line:
+                    position = file_size
+                    break
+                if log_pattern.match(line.decode('utf-8', errors='replace').rstrip()):
+                    break
+
+            if offsets[-1] < position < file_size:
+                offsets.append(position)
+
+    offsets.append(file_size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+def _parse_chunk(args):
+    """
+    Worker: parses one byte range of the export.
+    """
+    input_file, start, end, since = args
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    # Same decoding and newline handling as open(input_file, 'r')
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+    return list(iter_entries(lines, since=since))
+
+def iter_entries_parallel(input_file, workers, since=None):
+    """
+    Parses the export in a process pool and hands back the entries in file order.
+    """
+    # A few chunks per worker keeps the pool busy when some ranges are denser than others
+    file_size = os.path.getsize(input_file)
+    chunk_count = max(workers * 4, file_size // PARALLEL_CHUNK_BYTES + 1)
+    chunks = [(input_file, start, end, since) for start, end in find_chunk_offsets(input_file, chunk_count)]
+
+    # A bounded window of chunks: when the workers parse faster than SQLite
+    # writes, they wait instead of piling up the whole parsed file in memory
+    max_pending = workers * PARALLEL_CHUNKS_IN_FLIGHT
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            if len(pending) >= max_pending:
+                yield from pending.popleft().get()
+            pending.append(pool.apply_async(_parse_chunk, (chunk,)))
+        while pending:
+            yield from pending.popleft().get()
+
+def _ingest_chat(args):
+    """
+    Worker: ingests one export into its chat's shard. Returns the chat id and
+    what parse_whatsapp_chat printed, so the output of parallel chats doesn't interleave.
+    """
+    chat_id, input_file, db_file, options = args
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        parse_whatsapp_chat(input_file, db_file, **options)
+    return chat_id, output.getvalue()
+
+def ingest_directory(input_dir, chat_dir=CHAT_DIR, workers=1, **options):
+    """
+    Ingests every export in input_dir into its own database in chat_dir
+    (chats.py), several chats at a time in a process pool. Every chat is
+    parsed in a single process there; the options go to parse_whatsapp_chat.
+    """
+    exports = find_exports(input_dir)
+    if not exports:
+        print(f"No exports (*.txt) found in '{input_dir}'")
+        return []
+    os.makedirs(chat_dir, exist_ok=True)
+    jobs = [(chat_id, input_file, shard_path(chat_id, chat_dir), options) for chat_id, input_file in exports.items()]
+
+    start_time = time.perf_counter()
+    if workers > 1:
+        with multiprocessing.Pool(min(workers, len(jobs))) as pool:
+            results = list(pool.imap_unordered(_ingest_chat, jobs))
+    else:
+        results = [_ingest_chat(job) for job in jobs]
+
+    for chat_id, output in sorted(results):
+        for line in output.splitlines():
+            print(f"[{chat_id}] {line}")
+    print(f"{len(jobs)} chats ingested into '{chat_dir}' in {time.perf_counter() - start_time:.2f}s")
+    return sorted(exports)
+
+@lru_cache(maxsize=None)
+def _iso_date(date_part):
+    return datetime.strptime(date_part, '%m/%d/%y').strftime('%Y-%m-%d')
+
+def fast_timestamp(raw_timestamp):
+    """
+    Converts 'MM/DD/YY, HH:MM' to 'YYYY-MM-DD HH:MM:SS'.
+    Same result as strptime/strftime, but the date half is cached (a chat has
+    thousands of messages per distinct day) and the time half is checked by hand.
+    Raises ValueError for anything strptime would reject.
+    """
+    date_part, time_part = raw_timestamp.split(', ')
+    iso_date = _iso_date(date_part)
+    if time_part[:2] > '23' or time_part[3:] > '59':
+        raise ValueError(f"Invalid time: {time_part}")
+    return f"{iso_date} {time_part}:00"
+
+def assign_hashes(entries):
+    """
+    Adds a 'content_hash' to every entry, used for the dedup key.
+    The same person can send the same text twice in one minute ("ok", "haha"),
+    so the hash also covers how many identical messages came before it in that minute.
+    """
+    current_timestamp = None
+    occurrences = {}
+
+    for entry in entries:
+        if entry['timestamp'] != current_timestamp:
+            current_timestamp = entry['timestamp']
+            occurrences = {}
+
+        key = (entry['sender'], entry['message_content'])
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+
+        digest = hashlib.blake2b(entry['message_content'].encode('utf-8'), digest_size=8)
+        digest.update(str(occurrence).encode('ascii'))
+        entry['content_hash'] = digest.hexdigest()
+        yield entry
+
+def entry_to_row(entry):
+    return (
+        entry['timestamp'],
+        entry['sender'],
+        entry['message_content'],
+        entry['has_media'],
+        entry['is_poll'],
+        entry['content_hash']
+    )
 
 def finalize_and_save(cursor, entry):
     """
     Helper function to save the entry to DB.
+    Returns 1 if it was stored, 0 if it was already there.
     """
     cursor.execute('''
-        INSERT INTO messages (timestamp, sender, message_content, has_media, is_poll)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (
-        entry['timestamp'], 
-        entry['sender'], 
-        entry['message_content'], 
-        entry['has_media'], 
-        entry['is_poll']
-    ))
+        INSERT OR IGNORE INTO messages (timestamp, sender, message_content, has_media, is_poll, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', entry_to_row(entry))
+    return cursor.rowcount
+
+def save_batch(cursor, rows):
+    """
+    Helper function to save a batch of rows to DB in one go.
+    Returns the number of rows that were actually new.
+    """
+    cursor.executemany('''
+        INSERT OR IGNORE INTO messages (timestamp, sender, message_content, has_media, is_poll, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows)
+    return cursor.rowcount
 
 if __name__ == "__main__":
-    parse_whatsapp_chat('chat.txt', 'chat_data.db')
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Parse a WhatsApp chat export into SQLite.")
+    arg_parser.add_argument('input_file', nargs='?', default='chat.txt')
+    arg_parser.add_argument('db_file', nargs='?', default='chat_data.db')
+    arg_parser.add_argument('--bulk', action='store_true',
+                            help="Insert rows in large batches, without journaling/fsync when the database is new. "
+                                 "Only modestly faster (5-15%%): the default path also inserts in one transaction")
+    arg_parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE)
+    arg_parser.add_argument('--incremental', action='store_true',
+                            help="Skip messages older than the last ingest (for daily re-exports)")
+    arg_parser.add_argument('--workers', type=int, default=1,
+                            help="Parse the export in this many processes (for very large files); "
+                                 "with --input-dir: ingest this many chats at the same time")
+    arg_parser.add_argument('--input-dir', default=None,
+                            help="Ingest every export (*.txt) in this directory into its own database in --chat-dir")
+    arg_parser.add_argument('--chat-dir', default=CHAT_DIR,
+                            help=f"Where --input-dir puts the per-chat databases (default {CHAT_DIR})")
+    arg_parser.add_argument('--daily-tokens', action='store_true',
+                            help="Also keep word counts per day (makes date-filtered vocabulary stats fast)")
+    arg_parser.add_argument('--session-gap-hours', type=float, default=None,
+                            help="Silence after which a new conversation session starts (default 6)")
+    arg_parser.add_argument('--snapshot', action='store_true',
+                            help="Also write the columnar snapshot the dashboard starts from (see snapshot.py)")
+    args = arg_parser.parse_args()
+
+    if args.input_dir:
+        ingest_directory(args.input_dir, args.chat_dir, workers=args.workers, bulk=args.bulk,
+                         batch_size=args.batch_size, incremental=args.incremental,
+                         daily_tokens=args.daily_tokens, session_gap_hours=args.session_gap_hours,
+                         snapshot=args.snapshot)
+    else:
+        parse_whatsapp_chat(args.input_file, args.db_file, bulk=args.bulk, batch_size=args.batch_size,
+                            incremental=args.incremental, workers=args.workers,
+                            daily_tokens=args.daily_tokens, session_gap_hours=args.session_gap_hours,
+                            snapshot=args.snapshot)
\ No newline at end of file
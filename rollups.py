@@ -0,0 +1,45 @@
+"""
+Pre-aggregated activity counts, maintained by parser.py at ingest time.
+
+One row per (date, sender, hour) with the number of messages, media and polls.
+The dashboard reads this small table for the overview, night and weekend charts
+instead of scanning every message.
+"""
+
+def create_rollup_tables(cursor):
+    # weekday follows pandas: 0 = Monday ... 6 = Sunday
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS activity_rollup (
+            date TEXT,
+            sender TEXT,
+            hour INTEGER,
+            weekday INTEGER,
+            msg_count INTEGER,
+            media_count INTEGER,
+            poll_count INTEGER,
+            PRIMARY KEY (date, sender, hour)
+        )
+    ''')
+
+def update_rollups(cursor, after_id):
+    """
+    Adds the messages with id > after_id to the rollup counts.
+    """
+    cursor.execute('''
+        INSERT INTO activity_rollup (date, sender, hour, weekday, msg_count, media_count, poll_count)
+        SELECT
+            substr(timestamp, 1, 10),
+            sender,
+            CAST(substr(timestamp, 12, 2) AS INTEGER),
+            (CAST(strftime('%w', substr(timestamp, 1, 10)) AS INTEGER) + 6) % 7,
+            COUNT(*),
+            SUM(has_media),
+            SUM(is_poll)
+        FROM messages
+        WHERE id > ?
+        GROUP BY 1, 2, 3
+        ON CONFLICT (date, sender, hour) DO UPDATE SET
+            msg_count = msg_count + excluded.msg_count,
+            media_count = media_count + excluded.media_count,
+            poll_count = poll_count + excluded.poll_count
+    ''', (after_id,))
@@ -0,0 +1,39 @@
+"""
+Full-text index over message_content for the Archief tab.
+
+messages_fts is an external-content FTS5 table: it stores only the index and
+reads the text from 'messages', keyed on messages.id. parser.py adds new
+messages to it after every ingest.
+"""
+
+def create_search_index(cursor):
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            message_content,
+            content = 'messages',
+            content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+
+def update_search_index(cursor, after_id):
+    """
+    Indexes the messages with id > after_id.
+    """
+    cursor.execute('''
+        INSERT INTO messages_fts (rowid, message_content)
+        SELECT id, message_content FROM messages WHERE id > ?
+    ''', (after_id,))
+
+def to_fts_query(text):
+    """
+    Turns what the user typed into a safe FTS5 query: every word must occur,
+    and the last one may still be half typed ("piz" finds "pizza").
+    Quoting each word means characters like ? ( * " are searched for literally.
+    """
+    terms = text.split()
+    if not terms:
+        return None
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
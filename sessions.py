@@ -0,0 +1,147 @@
+"""
+Conversation context per message and conversation sessions, maintained at ingest.
+
+message_context stores, for every message, who sent the message before it, how
+many seconds lay in between and which session it belongs to. A new session
+starts when the gap exceeds the session gap (6 hours unless configured otherwise).
+sessions summarizes each session: start, end, initiator, number of participants
+and number of messages.
+
+System messages (joins, subject changes) are not part of the conversation; they
+get no context and don't break the chain.
+"""
+from datetime import datetime
+
+DEFAULT_SESSION_GAP_SECONDS = 6 * 3600
+
+# Timestamps are naive wall-clock times; measuring from a naive epoch keeps gaps
+# the same as in pandas (no DST or local timezone shifts)
+_EPOCH = datetime(1970, 1, 1)
+
+def create_session_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS message_context (
+            id INTEGER PRIMARY KEY,
+            prev_sender TEXT,
+            gap_seconds INTEGER,
+            session_id INTEGER
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_message_context_session
+        ON message_context (session_id)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id INTEGER PRIMARY KEY,
+            start TEXT,
+            end TEXT,
+            initiator TEXT,
+            participants INTEGER,
+            message_count INTEGER
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_settings (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            gap_seconds INTEGER
+        )
+    ''')
+
+def get_session_gap(cursor):
+    row = cursor.execute('SELECT gap_seconds FROM session_settings WHERE id = 1').fetchone()
+    return row[0] if row else DEFAULT_SESSION_GAP_SECONDS
+
+def set_session_gap(cursor, gap_seconds):
+    """
+    Stores the session gap. Returns True if it differs from the one the
+    existing sessions were built with (they then have to be rebuilt).
+    """
+    changed = get_session_gap(cursor) != gap_seconds
+    cursor.execute('INSERT OR REPLACE INTO session_settings (id, gap_seconds) VALUES (1, ?)', (gap_seconds,))
+    return changed
+
+def _to_seconds(timestamp):
+    try:
+        return (datetime.fromisoformat(timestamp) - _EPOCH).total_seconds()
+    except (TypeError, ValueError):
+        return None
+
+def update_message_context(cursor, after_id):
+    """
+    Computes prev_sender, gap_seconds and session_id for the messages with id > after_id,
+    continuing the chain from the last message before them.
+    """
+    gap_limit = get_session_gap(cursor)
+
+    last = cursor.execute('''
+        SELECT m.timestamp, m.sender, c.session_id
+        FROM message_context c
+        JOIN messages m ON m.id = c.id
+        WHERE c.id <= ? AND c.session_id IS NOT NULL
+        ORDER BY c.id DESC
+        LIMIT 1
+    ''', (after_id,)).fetchone()
+    if last:
+        prev_time, prev_sender, session_id = _to_seconds(last[0]), last[1], last[2]
+    else:
+        prev_time, prev_sender, session_id = None, None, 0
+
+    rows = cursor.connection.execute(
+        'SELECT id, timestamp, sender FROM messages WHERE id > ? ORDER BY id', (after_id,)
+    )
+
+    def context_rows(prev_time, prev_sender, session_id):
+        for message_id, timestamp, sender in rows:
+            if sender == 'System':
+                yield (message_id, None, None, None)
+                continue
+
+            current_time = _to_seconds(timestamp)
+            gap = None
+            if current_time is not None and prev_time is not None:
+                gap = int(current_time - prev_time)
+
+            if session_id == 0 or (gap is not None and gap > gap_limit):
+                session_id += 1
+
+            yield (message_id, prev_sender, gap, session_id)
+            prev_sender = sender
+            if current_time is not None:
+                prev_time = current_time
+
+    cursor.executemany('''
+        INSERT OR REPLACE INTO message_context (id, prev_sender, gap_seconds, session_id)
+        VALUES (?, ?, ?, ?)
+    ''', context_rows(prev_time, prev_sender, session_id))
+
+def update_sessions(cursor, after_id):
+    """
+    Rebuilds the summary of every session touched by the messages with id > after_id.
+    Runs after update_message_context.
+    """
+    first_session = cursor.execute(
+        'SELECT MIN(session_id) FROM message_context WHERE id > ?', (after_id,)
+    ).fetchone()[0]
+    if first_session is None:
+        return
+
+    cursor.execute('''
+        INSERT OR REPLACE INTO sessions (session_id, start, end, initiator, participants, message_count)
+        WITH per_session AS (
+            SELECT
+                c.session_id,
+                MIN(m.id) AS first_id,
+                MIN(m.timestamp) AS start,
+                MAX(m.timestamp) AS end,
+                COUNT(DISTINCT m.sender) AS participants,
+                COUNT(*) AS message_count
+            FROM message_context c
+            JOIN messages m ON m.id = c.id
+            WHERE c.session_id >= ?
+            GROUP BY c.session_id
+        )
+        SELECT s.session_id, s.start, s.end, first.sender, s.participants, s.message_count
+        FROM per_session s
+        JOIN messages first ON first.id = s.first_id
+    ''', (first_session,))
@@ -0,0 +1,143 @@
+"""
+Columnar snapshot of the messages for a fast dashboard cold start.
+
+The snapshot is an uncompressed Arrow IPC (Feather v2) file next to the
+database (chat_data.db -> chat_data.arrow) holding the messages plus their
+message_features and message_context columns, already in their final types.
+Readers memory-map it, so opening it costs almost nothing and only the
+columns asked for are read from disk. The frames are not shared: filtering and
+to_pandas copy the selected rows into each reader's own memory.
+
+The file records the database version it was written from (see
+database_version). read_snapshot returns None when the snapshot is missing or
+stale, and the caller falls back to SQLite.
+"""
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from features import FEATURE_COLUMNS
+from frames import compact_frame
+from sessions import get_session_gap
+
+SNAPSHOT_COLUMNS = (
+    ['timestamp', 'sender', 'message_content', 'has_media', 'is_poll']
+    + FEATURE_COLUMNS
+    + ['prev_sender', 'gap_seconds']
+)
+
+_VERSION_KEY = b'db_version'
+
+def snapshot_path(db_file):
+    return os.path.splitext(db_file)[0] + '.arrow'
+
+def database_version(conn):
+    """
+    Changes whenever the snapshot contents would: new messages or sessions cut
+    with another gap.
+    """
+    max_id, count = conn.execute('SELECT COALESCE(MAX(id), 0), COUNT(*) FROM messages').fetchone()
+    try:
+        gap = get_session_gap(conn.cursor())
+    except sqlite3.OperationalError:
+        gap = None
+    return f'{max_id}:{count}:{gap}'
+
+def write_snapshot(db_file, snapshot_file=None):
+    """
+    Writes the snapshot for db_file. Returns the number of messages written.
+    """
+    snapshot_file = snapshot_file or snapshot_path(db_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        version = database_version(conn)
+        df = pd.read_sql_query('''
+            SELECT m.timestamp, m.sender, m.message_content, m.has_media, m.is_poll,
+                   f.word_count, f.has_question, f.is_shout, f.has_link, f.swear_count, f.is_negative,
+                   c.prev_sender, c.gap_seconds
+            FROM messages m
+            LEFT JOIN message_features f ON f.id = m.id
+            LEFT JOIN message_context c ON c.id = m.id
+            ORDER BY m.id
+        ''', conn)
+    finally:
+        conn.close()
+
+    # Same types the dashboard ends up with, so loading needs no conversion
+    df = compact_frame(df)
+    table = pa.Table.from_pandas(df[SNAPSHOT_COLUMNS], preserve_index=False)
+    table = table.replace_schema_metadata({_VERSION_KEY: version.encode()})
+
+    # Write next to the target and swap it in, so readers never see half a file
+    tmp_file = snapshot_file + '.tmp'
+    with pa.OSFile(tmp_file, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_file, snapshot_file)
+    return table.num_rows
+
+def read_snapshot(db_file, users=None, start_date=None, end_date=None, columns=SNAPSHOT_COLUMNS, snapshot_file=None):
+    """
+    Memory-maps the snapshot and returns the messages that pass the filters
+    (same semantics as the dashboard's SQL filters), in message order, as a
+    frame of its own.
+    Returns None when there is no snapshot or it doesn't match the database.
+    """
+    snapshot_file = snapshot_file or snapshot_path(db_file)
+    if not os.path.exists(snapshot_file):
+        return None
+
+    conn = sqlite3.connect(db_file)
+    try:
+        version = database_version(conn)
+    finally:
+        conn.close()
+
+    table = pa.ipc.open_file(pa.memory_map(snapshot_file, 'r')).read_all()
+    if (table.schema.metadata or {}).get(_VERSION_KEY) != version.encode():
+        return None
+    if any(col not in table.schema.names for col in columns):
+        return None
+
+    mask = None
+    if users is not None:
+        sender = table['sender'].cast(pa.string())
+        mask = pc.is_in(sender, value_set=pa.array(list(users), pa.string()))
+    if start_date is not None:
+        start = pa.scalar(datetime.combine(start_date, datetime.min.time()), table.schema.field('timestamp').type)
+        mask = _and(mask, pc.greater_equal(table['timestamp'], start))
+    if end_date is not None:
+        # The end date is inclusive: everything before the start of the next day
+        end = pa.scalar(datetime.combine(end_date + timedelta(days=1), datetime.min.time()), table.schema.field('timestamp').type)
+        mask = _and(mask, pc.less(table['timestamp'], end))
+
+    table = table.select(list(columns))
+    if mask is not None:
+        table = table.filter(mask)
+
+    df = table.to_pandas()
+    # Only the senders in this selection, like a frame read from SQLite
+    for col in ('sender', 'prev_sender'):
+        if col in df and isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+def _and(mask, condition):
+    return condition if mask is None else pc.and_(mask, condition)
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Write the columnar snapshot the dashboard loads at startup.")
+    arg_parser.add_argument('db_file', nargs='?', default='chat_data.db')
+    arg_parser.add_argument('snapshot_file', nargs='?', default=None)
+    args = arg_parser.parse_args()
+
+    start_time = time.perf_counter()
+    rows = write_snapshot(args.db_file, args.snapshot_file)
+    elapsed = time.perf_counter() - start_time
+    print(f"Snapshot written ({rows} messages in {elapsed:.2f}s) to {args.snapshot_file or snapshot_path(args.db_file)}")
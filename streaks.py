@@ -0,0 +1,82 @@
+"""
+Run-length metrics over active days (streaks and silences), computed for all
+senders at once.
+
+Input is a frame with a 'sender' and a 'date' column, one row per message or
+per (date, sender) pair; the activity_rollup table works as is. Everything is a
+sort plus a few vectorized diffs and groupbys, so the cost is one pass over the
+distinct (sender, date) pairs no matter how many people are in the chat.
+"""
+import numpy as np
+import pandas as pd
+
+STREAK_COLUMNS = ['sender', 'longest_streak', 'current_streak', 'longest_silence']
+
+def _day_numbers(dates):
+    return pd.to_datetime(dates).values.astype('datetime64[D]').astype(np.int64)
+
+def user_streaks(activity, reference_date=None):
+    """
+    Per sender:
+    - longest_streak: most consecutive days with at least one message
+    - current_streak: the streak that is still going on reference_date (missing only
+      that day itself is allowed, the day isn't over yet)
+    - longest_silence: most consecutive days without a message, between the first
+      message and reference_date
+    reference_date defaults to the last active day in 'activity'.
+    """
+    if activity.empty:
+        return pd.DataFrame(columns=STREAK_COLUMNS)
+
+    pairs = pd.DataFrame({
+        'sender': np.asarray(activity['sender'], dtype=object),
+        'day': _day_numbers(activity['date']),
+    }).drop_duplicates().sort_values(['sender', 'day'], ignore_index=True)
+
+    if reference_date is None:
+        reference_day = int(pairs['day'].max())
+    else:
+        reference_day = int(_day_numbers([reference_date])[0])
+
+    sender = pairs['sender'].to_numpy()
+    day = pairs['day'].to_numpy()
+    first_of_sender = np.r_[True, sender[1:] != sender[:-1]]
+    gap = np.r_[0, np.diff(day)]
+
+    # A new run starts at every sender change and every gap of more than one day
+    run_id = np.cumsum(first_of_sender | (gap != 1))
+    runs = pd.DataFrame({'sender': sender, 'run_id': run_id, 'day': day}).groupby('run_id').agg(
+        sender=('sender', 'first'),
+        length=('day', 'size'),
+        last_day=('day', 'max'),
+    )
+    by_sender = runs.groupby('sender')
+
+    longest_streak = by_sender['length'].max()
+
+    last_run = by_sender.tail(1).set_index('sender')
+    alive = last_run['last_day'] >= reference_day - 1
+    current_streak = last_run['length'].where(alive, 0)
+
+    # Silence between two active days is gap - 1; after the last active day it
+    # runs until reference_date
+    silence_between = pd.Series(np.where(first_of_sender, 0, gap - 1), index=sender).groupby(level=0).max()
+    silence_after = (reference_day - last_run['last_day']).clip(lower=0)
+    longest_silence = np.maximum(silence_between, silence_after)
+
+    result = pd.DataFrame({
+        'longest_streak': longest_streak,
+        'current_streak': current_streak,
+        'longest_silence': longest_silence,
+    }).rename_axis('sender').reset_index()
+    return result[STREAK_COLUMNS].astype({col: 'int64' for col in STREAK_COLUMNS[1:]})
+
+def longest_group_run(activity):
+    """
+    Most consecutive days on which anyone in 'activity' said something.
+    """
+    if activity.empty:
+        return 0
+    days = np.unique(_day_numbers(activity['date']))
+    run_id = np.cumsum(np.r_[True, np.diff(days) != 1])
+    return int(np.bincount(run_id).max())
@@ -0,0 +1,173 @@
+"""
+Synthetic WhatsApp exports for benchmarks and load tests.
+
+Generates text in the same format as a real export ("M/D/YY, HH:MM - Sender:
+Message"): conversations in bursts, busy and quiet days, more activity in the
+evening, a few senders doing most of the talking, multi-line messages, polls
+with OPTION: lines, <Media omitted>, system lines (joins, adds, subject
+changes), links, questions, shouting, swear words and emoji including skin
+tones, ZWJ sequences and flags.
+
+The output is deterministic for a given seed and is written line by line, so
+millions of messages don't need to fit in memory.
+"""
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+
+WORDS = (
+    'ik je de het een en is dat niet van wat op te er maar ja nee zo met die '
+    'ook wel nog al dan kan was heb hij zij we jullie gaan komen morgen vanavond '
+    'vandaag straks even echt gewoon haha lol oke top lekker mooi goed slecht '
+    'eten bier feest trein werk school weekend weer regen zon voetbal wedstrijd '
+    'film serie boek muziek concert vakantie huis auto fiets stad feestje borrel'
+).split()
+SWEARS = ['kut', 'gvd', 'shit', 'tering', 'kk', 'verdomme', 'fuck']
+EMOJI = ['😂', '👍', '❤️', '🙈', '🔥', '🎉', '😅', '🍻', '👍🏽', '👋🏻', '👨‍👩‍👧', '🏳️‍🌈', '🇳🇱', '🦁']
+LINKS = ['https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'https://nos.nl/artikel/123456', 'www.voorbeeld.nl/menu']
+POLL_QUESTIONS = ['Waar eten we?', 'Wie komt er zaterdag?', 'Welke film?', 'Hoe laat verzamelen?']
+POLL_OPTIONS = ['Pizza', 'Sushi', 'Thuis', 'Ja', 'Nee', 'Misschien', '19:00', '20:00', 'Kroeg']
+SUBJECTS = ['De Leeuwen 🦁', 'Weekendplannen', 'Voetbal team', 'Familie']
+
+FIRST_NAMES = ['Jorn', 'Klaas', 'Anna', 'Piet', 'Sanne', 'Daan', 'Lotte', 'Bram', 'Eva', 'Sem', 'Fleur', 'Tim']
+LAST_NAMES = ['Jansen', 'de Vries', 'Bakker', 'Visser', 'Smit', 'Meijer']
+
+# Time span of the generated chat; the message rate scales with the size
+DEFAULT_DAYS = 3 * 365
+
+# Relative activity per hour of the day (quiet at night, busy in the evening)
+HOUR_WEIGHTS = [2, 1, 1, 1, 1, 1, 2, 4, 6, 6, 6, 7, 8, 7, 6, 6, 7, 8, 9, 10, 11, 10, 8, 4]
+
+def make_senders(count, rng):
+    senders = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.1:
+            # Contacts that aren't saved show up as phone numbers
+            name = f'+31 6 {rng.randint(10000000, 99999999)}'
+        elif kind < 0.3:
+            name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        else:
+            name = FIRST_NAMES[i % len(FIRST_NAMES)] + ('' if i < len(FIRST_NAMES) else f' {i}')
+        if rng.random() < 0.05:
+            name += ' 🦁'
+        senders.append(name)
+    return list(dict.fromkeys(senders))
+
+def format_timestamp(moment):
+    return f"{moment.month}/{moment.day}/{moment:%y}, {moment:%H:%M}"
+
+def make_text(rng):
+    words = rng.choices(WORDS, k=rng.randint(1, 14))
+    roll = rng.random()
+    if roll < 0.05:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(SWEARS))
+    elif roll < 0.08:
+        words.append(rng.choice(LINKS))
+    if rng.random() < 0.25:
+        words.append(''.join(rng.choices(EMOJI, k=rng.randint(1, 3))))
+    text = ' '.join(words)
+    if rng.random() < 0.12:
+        text += '?'
+    if rng.random() < 0.03:
+        text = text.upper()
+    if rng.random() < 0.06:
+        # Multi-line message
+        text += '\n' + ' '.join(rng.choices(WORDS, k=rng.randint(2, 8)))
+    return text
+
+def make_poll(rng):
+    options = rng.sample(POLL_OPTIONS, rng.randint(2, 4))
+    lines = ['POLL:', rng.choice(POLL_QUESTIONS)]
+    lines += [f'OPTION: {option} ({rng.randint(0, 6)} votes)' for option in options]
+    return '\n'.join(lines)
+
+def make_system(senders, rng):
+    who, other = rng.choice(senders), rng.choice(senders)
+    roll = rng.random()
+    if roll < 0.4:
+        return f"{who} joined using this group's invite link"
+    if roll < 0.7:
+        return f'{who} added {other}'
+    if roll < 0.85:
+        return f'{who} changed the subject from "{rng.choice(SUBJECTS)}" to "{rng.choice(SUBJECTS)}"'
+    return f'{who} left'
+
+def day_minutes(count, rng):
+    """
+    Minute of the day for each of 'count' messages: a few conversations at
+    plausible hours, messages within a conversation a few minutes apart.
+    """
+    minutes = []
+    while len(minutes) < count:
+        size = min(count - len(minutes), rng.randint(3, 60))
+        minute = rng.choices(range(24), HOUR_WEIGHTS)[0] * 60 + rng.randint(0, 59)
+        for _ in range(size):
+            minutes.append(min(minute, 24 * 60 - 1))
+            minute += rng.choice([0, 0, 0, 1, 1, 2, 3, 5, 8, 15])
+    return sorted(minutes)
+
+def generate_lines(messages, senders=8, days=DEFAULT_DAYS, seed=1, start=datetime(2021, 1, 1)):
+    """
+    Yields the export lines for 'messages' messages spread over roughly 'days'
+    days (multi-line messages yield several lines).
+    """
+    rng = random.Random(seed)
+    names = make_senders(senders, rng)
+    # Zipf-like: the first few senders do most of the talking
+    sender_weights = [1 / (rank + 1) for rank in range(len(names))]
+    per_day = messages / days
+
+    yield f'{format_timestamp(start)} - Messages and calls are end-to-end encrypted. No one outside of this chat, not even WhatsApp, can read or listen to them. Tap to learn more.'
+    speaker = rng.choices(names, sender_weights)[0]
+    remaining = messages - 1
+    day = start
+
+    while remaining > 0:
+        # Busy days, quiet days and days without a single message
+        count = min(remaining, int(rng.expovariate(1 / per_day) + 0.5))
+        remaining -= count
+
+        for minute in day_minutes(count, rng):
+            moment = day + timedelta(minutes=minute)
+
+            # People often send several messages in a row
+            if rng.random() < 0.55:
+                speaker = rng.choices(names, sender_weights)[0]
+
+            roll = rng.random()
+            if roll < 0.005:
+                body = make_system(names, rng)
+            elif roll < 0.04:
+                body = f'{speaker}: <Media omitted>'
+            elif roll < 0.045:
+                body = f'{speaker}: {make_poll(rng)}'
+            elif roll < 0.05:
+                body = f'{speaker}: This message was deleted'
+            else:
+                body = f'{speaker}: {make_text(rng)}'
+
+            yield from f'{format_timestamp(moment)} - {body}'.split('\n')
+
+        day += timedelta(days=1)
+
+def write_chat(output_file, messages, senders=8, days=DEFAULT_DAYS, seed=1):
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for line in generate_lines(messages, senders=senders, days=days, seed=seed):
+            f.write(line + '\n')
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Generate a synthetic WhatsApp chat export.")
+    arg_parser.add_argument('messages', type=int, help="Number of messages to generate")
+    arg_parser.add_argument('output_file', nargs='?', default=None, help="Defaults to stdout")
+    arg_parser.add_argument('--senders', type=int, default=8)
+    arg_parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help="Approximate time span of the chat")
+    arg_parser.add_argument('--seed', type=int, default=1)
+    args = arg_parser.parse_args()
+
+    if args.output_file:
+        write_chat(args.output_file, args.messages, senders=args.senders, days=args.days, seed=args.seed)
+    else:
+        for line in generate_lines(args.messages, senders=args.senders, days=args.days, seed=args.seed):
+            sys.stdout.write(line + '\n')
@@ -0,0 +1,86 @@
+"""
+Chat ids, export discovery and ingesting a directory of exports into shards.
+"""
+import sqlite3
+
+import pytest
+
+import parser
+from chats import chat_id_for, find_exports, list_chats, shard_path
+from synthetic import generate_lines
+
+@pytest.mark.parametrize('export_file, chat_id', [
+    ('WhatsApp Chat with De Leeuwen.txt', 'de-leeuwen'),
+    ('WhatsApp Chat met De Leeuwen.txt', 'de-leeuwen'),
+    ('whatsapp chat with de leeuwen.TXT', 'de-leeuwen'),
+    ('exports/WhatsApp Chat with Oma & Opa (2).txt', 'oma-opa-2'),
+    ('Café Noir.txt', 'cafe-noir'),
+    ('__vakantie__.txt', 'vakantie'),
+    ('🦁🦁.txt', 'chat'),
+])
+def test_chat_id_for(export_file, chat_id):
+    assert chat_id_for(export_file) == chat_id
+
+def touch(path, text=''):
+    path.write_text(text, encoding='utf-8')
+    return path
+
+def test_find_exports(tmp_path):
+    touch(tmp_path / 'WhatsApp Chat with De Leeuwen.txt')
+    touch(tmp_path / 'Familie.TXT')
+    touch(tmp_path / 'notes.md')
+    (tmp_path / 'oud.txt').mkdir()
+    assert find_exports(tmp_path) == {
+        'de-leeuwen': str(tmp_path / 'WhatsApp Chat with De Leeuwen.txt'),
+        'familie': str(tmp_path / 'Familie.TXT'),
+    }
+
+@pytest.mark.parametrize('first, second', [
+    ('WhatsApp Chat with De Leeuwen.txt', 'WhatsApp Chat met De Leeuwen.txt'),
+    ('Oma & Opa.txt', 'oma-opa.txt'),
+    ('Café.txt', 'Cafe.txt'),
+])
+def test_colliding_exports_are_an_error(tmp_path, first, second):
+    touch(tmp_path / first)
+    touch(tmp_path / second)
+    with pytest.raises(ValueError, match='would both become chat'):
+        find_exports(tmp_path)
+
+def test_list_chats(tmp_path):
+    assert list_chats(tmp_path / 'missing') == []
+    touch(tmp_path / 'b.db')
+    touch(tmp_path / 'a.db')
+    touch(tmp_path / 'a.db-journal')
+    touch(tmp_path / 'a.arrow')
+    (tmp_path / 'c.db').mkdir()
+    assert list_chats(tmp_path) == ['a', 'b']
+
+def messages(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute("SELECT timestamp, sender, message_content FROM messages ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_ingest_directory(tmp_path, workers):
+    input_dir = tmp_path / 'exports'
+    input_dir.mkdir()
+    for seed, name in enumerate(['WhatsApp Chat with De Leeuwen', 'Familie', 'Werk']):
+        lines = generate_lines(400, senders=3 + seed, days=30, seed=seed)
+        touch(input_dir / f'{name}.txt', '\n'.join(lines) + '\n')
+    chat_dir = tmp_path / 'chats'
+
+    assert parser.ingest_directory(str(input_dir), str(chat_dir), workers=workers) == ['de-leeuwen', 'familie', 'werk']
+    assert list_chats(chat_dir) == ['de-leeuwen', 'familie', 'werk']
+
+    # Every shard holds its own export, as if that export was ingested alone
+    for chat_id, input_file in find_exports(input_dir).items():
+        alone = tmp_path / f'{chat_id}.db'
+        parser.parse_whatsapp_chat(input_file, str(alone))
+        assert messages(shard_path(chat_id, chat_dir)) == messages(alone)
+
+def test_ingest_directory_without_exports(tmp_path, capsys):
+    assert parser.ingest_directory(str(tmp_path), str(tmp_path / 'chats')) == []
+    assert 'No exports' in capsys.readouterr().out
+    assert not (tmp_path / 'chats').exists()
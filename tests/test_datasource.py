@@ -0,0 +1,57 @@
+"""
+metric_data on a database from an older parser, without the derived tables:
+the fallbacks in build_metric_data must give the same metrics.
+"""
+import sqlite3
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import parser
+from datasource import metric_data, read_senders
+from metrics import registry
+from synthetic import generate_lines
+
+# Computed from the rollup, token and emoji tables when they are there
+FALLBACK_METRICS = ['overview_totals', 'user_totals', 'daily_activity', 'ranking', 'night_counts',
+                    'streaks', 'group_streak', 'vocabulary', 'word_frequencies', 'top_swears', 'top_emojis']
+
+@pytest.fixture(scope='module')
+def databases(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('datasource')
+    input_file = workdir / 'chat.txt'
+    input_file.write_text('\n'.join(generate_lines(1500, senders=4, days=60, seed=5)) + '\n', encoding='utf-8')
+    db_file = str(workdir / 'chat.db')
+    parser.parse_whatsapp_chat(str(input_file), db_file, daily_tokens=True)
+
+    old_db = str(workdir / 'old.db')
+    sqlite3.connect(db_file).backup(sqlite3.connect(old_db))
+    conn = sqlite3.connect(old_db)
+    for table in ('activity_rollup', 'token_counts', 'token_counts_daily', 'emoji_counts', 'message_emojis'):
+        conn.execute(f'DROP TABLE {table}')
+    conn.commit()
+    conn.close()
+    return db_file, old_db
+
+def compare(value, expected):
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(value.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False, check_categorical=False)
+    else:
+        assert value == expected
+
+@pytest.mark.parametrize('selection', ['everything', 'two senders', 'part of the period'])
+def test_old_database_gives_the_same_metrics(databases, selection):
+    db_file, old_db = databases
+    selection = {
+        'everything': (None, None, None),
+        'two senders': (read_senders(db_file)[:2], None, None),
+        'part of the period': (None, date(2021, 1, 15), date(2021, 2, 10)),
+    }[selection]
+    data = metric_data(db_file, *selection)
+    old_data = metric_data(old_db, *selection)
+    for name in FALLBACK_METRICS:
+        compare(registry.get(name, old_data), registry.get(name, data))
+    assert data.rollup['msg_count'].sum() > 0
+    assert old_data.is_loaded('texts') and not data.is_loaded('texts')
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from emojis import find_emojis
+from metrics import top_emojis
+
+def test_sequences_count_as_one_emoji():
+    assert find_emojis('👍🏽 top') == ['👍🏽']
+    assert find_emojis('👨‍👩‍👧‍👦') == ['👨‍👩‍👧‍👦']
+    assert find_emojis('op naar 🇳🇱🇧🇪!') == ['🇳🇱', '🇧🇪']
+    assert find_emojis('1️⃣ of 2️⃣') == ['1️⃣', '2️⃣']
+
+def test_skin_tone_is_part_of_the_emoji():
+    # A modifier on its own is still found, but never split off a base emoji
+    assert find_emojis('👍🏽👍') == ['👍🏽', '👍']
+
+def test_qualified_and_unqualified_forms_are_the_same_emoji():
+    assert find_emojis('❤️❤') == ['❤️', '❤️']
+    assert find_emojis('☺ ☺️') == ['☺️', '☺️']
+    assert find_emojis('❤️‍🔥❤‍🔥') == ['❤️‍🔥', '❤️‍🔥']
+
+def test_no_emoji():
+    assert find_emojis('') == []
+    assert find_emojis(None) == []
+    assert find_emojis('gewoon tekst: 100% (ok) #1 *') == []
+
+class Selection:
+    def __init__(self, emojis):
+        self.emojis = emojis
+
+def test_top_emojis_merges_stored_unqualified_forms():
+    # Databases ingested before normalization store both spellings
+    emojis = pd.DataFrame({'sender': ['A', 'B', 'A'], 'emoji': ['❤️', '❤', '😂'], 'count': [2, 3, 4]})
+    top = top_emojis(Selection(emojis))
+    assert dict(zip(top['Emoji'], top['Count'])) == {'❤️': 5, '😂': 4}
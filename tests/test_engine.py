@@ -0,0 +1,98 @@
+"""
+The precomputed report: computing it, storing it as JSON or Parquet, and
+recognizing when it no longer matches the database.
+"""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import parser
+from datasource import read_senders
+from engine import compute_report, load_report, matching_report, report_covers, report_path, write_report
+from metrics import registry
+from synthetic import generate_lines
+
+@pytest.fixture(scope='module')
+def lines():
+    return list(generate_lines(2000, senders=4, days=60, seed=11))
+
+def ingest(tmp_path, lines, name='chat'):
+    input_file = tmp_path / f'{name}.txt'
+    input_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    db_file = str(tmp_path / f'{name}.db')
+    parser.parse_whatsapp_chat(str(input_file), db_file)
+    return db_file
+
+@pytest.fixture(scope='module')
+def db_file(lines, tmp_path_factory):
+    return ingest(tmp_path_factory.mktemp('engine'), lines)
+
+@pytest.fixture(scope='module')
+def report(db_file):
+    return compute_report(db_file)
+
+def same_time_unit(frame):
+    # JSON stores times without their resolution (us vs ns); the values must still match
+    return frame.astype({col: 'datetime64[ns]' for col in frame.select_dtypes('datetime').columns})
+
+def comparable(frame):
+    if frame.index.name is None:
+        # Only a named index is stored; the charts never use the positional one
+        frame = frame.reset_index(drop=True)
+    return same_time_unit(frame)
+
+def assert_same_metrics(loaded, expected):
+    assert list(loaded) == list(expected)
+    for name, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(comparable(loaded[name]), comparable(value),
+                                          check_index_type=False, obj=name)
+        else:
+            assert loaded[name] == value, name
+
+def test_report_has_every_metric(db_file, report):
+    assert list(report['metrics']) == registry.names()
+    # The dashboard's default selection
+    assert report['meta']['users'] == read_senders(db_file)
+
+@pytest.mark.parametrize('fmt', ['json', 'parquet'])
+def test_report_round_trip(report, tmp_path, fmt):
+    path = str(tmp_path / ('report.json' if fmt == 'json' else 'report'))
+    write_report(report, path, fmt)
+    loaded = load_report(path)
+
+    assert loaded['meta'] == report['meta']
+    assert_same_metrics(loaded['metrics'], report['metrics'])
+
+def test_missing_report(tmp_path):
+    assert load_report(str(tmp_path / 'nothing.report.json')) is None
+
+def test_workers_compute_the_same_report(db_file, report):
+    registry.clear()
+    parallel = compute_report(db_file, workers=2)
+    assert parallel['meta']['db_version'] == report['meta']['db_version']
+    assert_same_metrics(parallel['metrics'], report['metrics'])
+
+def test_selection(db_file, report):
+    users = report['meta']['users'][:2]
+    selected = compute_report(db_file, users=users, start_date=date(2021, 1, 10), end_date=date(2021, 2, 10),
+                              metrics=['overview_totals', 'ranking'])
+    assert list(selected['metrics']) == ['overview_totals', 'ranking']
+    assert set(selected['metrics']['ranking']['User']) <= set(users)
+    assert report_covers(selected, users, date(2021, 1, 10), date(2021, 2, 10))
+    assert not report_covers(selected, users, date(2021, 1, 10), date(2021, 2, 11))
+    assert not report_covers(selected, report['meta']['users'], date(2021, 1, 10), date(2021, 2, 10))
+
+def test_unknown_metric(db_file):
+    with pytest.raises(ValueError):
+        compute_report(db_file, metrics=['overview_totals', 'no_such_metric'])
+
+@pytest.mark.parametrize('fmt', ['json', 'parquet'])
+def test_report_goes_stale_after_an_ingest(lines, tmp_path, fmt):
+    db_file = ingest(tmp_path, lines[:1500])
+    write_report(compute_report(db_file), report_path(db_file, fmt), fmt)
+    assert matching_report(db_file) is not None
+
+    ingest(tmp_path, lines)
+    assert matching_report(db_file) is None
@@ -0,0 +1,58 @@
+"""
+extract_features against the pandas expressions the dashboard used to run on
+message_content for every rerun.
+"""
+import random
+import re
+
+import pandas as pd
+import pytest
+
+from features import FEATURE_COLUMNS, SWEAR_WORDS, extract_features
+from synthetic import make_text
+
+OLD_SWEAR_PATTERN = r'|'.join([r'\b' + w for w in SWEAR_WORDS]) + r'|kut|kanker|tering'
+
+EDGE_CASES = [
+    '', 'Waarom?', '???', 'NEE', 'NEE!!! 😡', 'HAHA ok', 'OK', 'Ok DOEI', '123 ABC 456',
+    'nee', 'Nee hoor', 'neee', 'geen idee', 'Niks aan de hand', 'nooit niet', 'nopes', 'benee',
+    'https://example.com', 'kijk op WWW.site.nl', 'www', 'httpx', 'HTTP',
+    'Kut', 'KUT', 'stomme kutzooi', 'kkr kk gvd', 'tyfushond', 'KANKERHOND', 'teringlijer', 'pikachu',
+    'schot', 'shitshow', 'verdomme!', 'ff checken\nNEE', 'EERSTE REGEL\nTWEEDE REGEL',
+    'ALLES\nbehalve dit', '  spaties   tussen  woorden ', 'GROEN 🍀 ?',
+]
+
+@pytest.fixture(scope='module')
+def texts():
+    rng = random.Random(3)
+    return pd.Series(EDGE_CASES + [make_text(rng) for _ in range(5000)])
+
+@pytest.fixture(scope='module')
+def features(texts):
+    return pd.DataFrame([extract_features(text) for text in texts], columns=FEATURE_COLUMNS)
+
+def test_word_count(texts, features):
+    old = texts.apply(lambda x: len(str(x).split()))
+    assert features['word_count'].tolist() == old.tolist()
+
+@pytest.mark.parametrize('column, old_filter', [
+    ('has_question', lambda texts: texts.str.contains(r'\?', na=False)),
+    ('is_shout', lambda texts: texts.str.match(r'^[^a-z]*[A-Z]{3,}[^a-z]*$', na=False)),
+    ('has_link', lambda texts: texts.str.contains(r'http|www\.', case=False, na=False)),
+    ('is_negative', lambda texts: texts.str.contains(r'\b(nee|niet|geen|nooit|nopes|niks)\b', case=False, na=False)),
+    ('swear_count', lambda texts: texts.str.contains(OLD_SWEAR_PATTERN, case=False, na=False)),
+])
+# The old negative pattern has a group, which pandas warns about
+@pytest.mark.filterwarnings('ignore:This pattern is interpreted as a regular expression')
+def test_flags_match_the_old_filters(texts, features, column, old_filter):
+    # The old charts counted the messages that matched, per sender
+    assert (features[column] > 0).tolist() == old_filter(texts).tolist()
+
+def test_swear_totals_match_the_old_word_list(texts, features):
+    # "Woordenlijst check" ran findall over all text joined together
+    all_text_blob = " ".join(texts.dropna().astype(str)).lower()
+    assert features['swear_count'].sum() == len(re.findall(OLD_SWEAR_PATTERN, all_text_blob))
+
+def test_the_sample_covers_every_feature(features):
+    assert (features.drop(columns='word_count') > 0).any().all()
+    assert (features == 0).all(axis=1).any()
@@ -0,0 +1,118 @@
+"""
+Ingest checks on a small synthetic chat (synthetic.py): every way of parsing
+and storing an export must end up with the same tables as one fresh ingest.
+"""
+import sqlite3
+
+import pytest
+
+import parser
+from features import FEATURE_COLUMNS
+from synthetic import generate_lines
+
+@pytest.fixture(scope='module')
+def lines():
+    return list(generate_lines(3000, senders=5, days=90, seed=7))
+
+def write_export(path, lines, newline='\n'):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for line in lines:
+            f.write(line + newline)
+    return str(path)
+
+def dump(db_file):
+    """Every table the parser writes, without the message ids."""
+    conn = sqlite3.connect(db_file)
+    queries = {
+        'messages': "SELECT timestamp, sender, message_content, has_media, is_poll, content_hash FROM messages ORDER BY id",
+        'activity_rollup': "SELECT * FROM activity_rollup ORDER BY date, sender, hour",
+        'features': f"SELECT {', '.join('f.' + col for col in FEATURE_COLUMNS)} "
+                    "FROM messages m JOIN message_features f ON f.id = m.id ORDER BY m.id",
+        'context': "SELECT c.prev_sender, c.gap_seconds FROM messages m JOIN message_context c ON c.id = m.id ORDER BY m.id",
+        'sessions': "SELECT start, end, initiator, participants, message_count FROM sessions ORDER BY start",
+        'token_counts': "SELECT * FROM token_counts ORDER BY sender, token",
+        'token_counts_daily': "SELECT * FROM token_counts_daily ORDER BY date, sender, token",
+        'emoji_counts': "SELECT * FROM emoji_counts ORDER BY sender, emoji",
+        'search': "SELECT COUNT(*) FROM messages_fts",
+    }
+    try:
+        return {name: conn.execute(query).fetchall() for name, query in queries.items()}
+    finally:
+        conn.close()
+
+def ingest(input_file, db_file, **options):
+    parser.parse_whatsapp_chat(input_file, str(db_file), daily_tokens=True, **options)
+    return str(db_file)
+
+@pytest.fixture(scope='module')
+def fresh_db(lines, tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('fresh')
+    return ingest(write_export(workdir / 'chat.txt', lines), workdir / 'chat.db')
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_parallel_parse_matches_serial(lines, tmp_path, monkeypatch, newline):
+    input_file = write_export(tmp_path / 'chat.txt', lines, newline)
+    # Tiny chunks, so nearly every chunk boundary lands inside the export and
+    # there are far more chunks than fit in the window
+    monkeypatch.setattr(parser, 'PARALLEL_CHUNK_BYTES', 2048)
+
+    serial = list(parser.iter_entries_from_file(input_file))
+    parallel = list(parser.iter_entries_parallel(input_file, workers=3))
+    assert len(serial) > 1000
+    assert parallel == serial
+
+def test_parallel_ingest_matches_serial(lines, fresh_db, tmp_path):
+    parallel = ingest(write_export(tmp_path / 'chat.txt', lines), tmp_path / 'parallel.db', workers=2)
+    assert dump(parallel) == dump(fresh_db)
+
+def test_bulk_ingest_matches_row_by_row(lines, fresh_db, tmp_path):
+    bulk = ingest(write_export(tmp_path / 'chat.txt', lines), tmp_path / 'bulk.db', bulk=True, batch_size=500)
+    assert dump(bulk) == dump(fresh_db)
+
+def test_bulk_keeps_journaling_on_existing_databases(lines, tmp_path, monkeypatch):
+    input_file = write_export(tmp_path / 'chat.txt', lines)
+    relaxed = []
+    monkeypatch.setattr(parser, 'relax_durability', lambda cursor: relaxed.append(cursor) or ('delete', 2))
+
+    db_file = ingest(input_file, tmp_path / 'chat.db', bulk=True)
+    ingest(input_file, db_file, bulk=True, incremental=True)
+    assert len(relaxed) == 1
+
+def test_incremental_matches_fresh_ingest(lines, fresh_db, tmp_path):
+    # Cut the export at the start of a message, about two thirds in
+    cut = next(i for i in range(len(lines) * 2 // 3, len(lines)) if parser.log_pattern.match(lines[i]))
+    db_file = ingest(write_export(tmp_path / 'part.txt', lines[:cut]), tmp_path / 'chat.db')
+    full_export = write_export(tmp_path / 'chat.txt', lines)
+    ingest(full_export, db_file, incremental=True)
+    assert dump(db_file) == dump(fresh_db)
+
+    # Re-running on the same export adds nothing, with or without the checkpoint
+    ingest(full_export, db_file, incremental=True)
+    ingest(full_export, db_file)
+    assert dump(db_file) == dump(fresh_db)
+
+def test_old_database_is_upgraded(lines, fresh_db, tmp_path):
+    # What the first parser version left behind after running twice on the same
+    # export: no content_hash, no derived tables and every message stored twice
+    db_file = str(tmp_path / 'old.db')
+    rows = sqlite3.connect(fresh_db).execute(
+        "SELECT timestamp, sender, message_content, has_media, is_poll FROM messages ORDER BY id"
+    ).fetchall()
+    conn = sqlite3.connect(db_file)
+    conn.execute('''
+        CREATE TABLE messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            sender TEXT,
+            message_content TEXT,
+            has_media INTEGER,
+            is_poll INTEGER
+        )
+    ''')
+    for _ in range(2):
+        conn.executemany("INSERT INTO messages (timestamp, sender, message_content, has_media, is_poll) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+    ingest(write_export(tmp_path / 'chat.txt', lines), db_file, incremental=True)
+    assert dump(db_file) == dump(fresh_db)
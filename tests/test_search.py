@@ -0,0 +1,85 @@
+"""
+The Archief search: to_fts_query and search_messages on a small chat.
+"""
+from datetime import date
+
+import pytest
+
+import parser
+from dashboard import search_messages
+from search import to_fts_query
+
+LINES = [
+    '1/5/21, 10:00 - Anna: Zullen we pizza bestellen?',
+    '1/5/21, 10:01 - Bram: Ja! Pizza met "extra" kaas (graag)',
+    '2/5/21, 09:00 - Anna: pizzeria om de hoek is dicht',
+    '2/6/21, 12:00 - Bram: café of pizza*',
+    '2/6/21, 12:05 - Anna: AND OR NOT NEAR(pizza)',
+]
+
+@pytest.fixture(scope='module')
+def db_file(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('search')
+    input_file = workdir / 'chat.txt'
+    input_file.write_text('\n'.join(LINES) + '\n', encoding='utf-8')
+    parser.parse_whatsapp_chat(str(input_file), str(workdir / 'chat.db'))
+    return str(workdir / 'chat.db')
+
+def search(db_file, query, users=('Anna', 'Bram'), start_date=None, end_date=None, **options):
+    return search_messages(db_file, 0, query, users, start_date, end_date, **options)
+
+def test_every_word_is_quoted_and_the_last_is_a_prefix():
+    assert to_fts_query('pizza') == '"pizza"*'
+    assert to_fts_query('  zullen   we piz ') == '"zullen" "we" "piz"*'
+
+def test_quotes_are_doubled():
+    assert to_fts_query('"extra" kaas') == '"""extra""" "kaas"*'
+    assert to_fts_query('a"b') == '"a""b"*'
+
+def test_empty_query():
+    assert to_fts_query('') is None
+    assert to_fts_query('   ') is None
+
+def test_half_typed_word_finds_the_whole_word(db_file):
+    results, total = search(db_file, 'piz')
+    assert total == 5
+    assert search(db_file, 'pizze')[1] == 1
+
+def test_all_words_must_occur(db_file):
+    results, total = search(db_file, 'pizza kaas')
+    assert total == 1
+    assert results['sender'].tolist() == ['Bram']
+
+@pytest.mark.parametrize('query', ['?', '(graag', 'pizza*', 'NEAR(', 'AND', 'OR pizza', '"', 'kaas"'])
+def test_syntax_characters_are_searched_literally(db_file, query):
+    # An unquoted query would make FTS5 raise, and the search would look
+    # like a database without an index (None)
+    assert search(db_file, query) is not None
+
+def test_operators_are_words(db_file):
+    results, total = search(db_file, 'NOT pizza')
+    assert total == 1
+    assert results['message_content'].str.contains('«NOT»').all()
+
+def test_diacritics_are_ignored(db_file):
+    assert search(db_file, 'cafe')[1] == 1
+
+def test_sender_filter(db_file):
+    results, total = search(db_file, 'pizza', users=('Bram',))
+    assert total == 2
+    assert set(results['sender']) == {'Bram'}
+
+def test_date_filter(db_file):
+    results, total = search(db_file, 'pizza', start_date=date(2021, 2, 1), end_date=date(2021, 2, 28))
+    assert total == 2
+    assert results['timestamp'].dt.month.eq(2).all()
+    assert search(db_file, 'pizza', start_date=date(2021, 3, 1), end_date=date(2021, 3, 31))[1] == 0
+
+def test_pages(db_file):
+    first, total = search(db_file, 'piz', page_size=2)
+    second, _ = search(db_file, 'piz', page=2, page_size=2)
+    last, _ = search(db_file, 'piz', page=3, page_size=2)
+    assert total == 5
+    assert (len(first), len(second), len(last)) == (2, 2, 1)
+    pages = list(first['message_content']) + list(second['message_content']) + list(last['message_content'])
+    assert len(set(pages)) == 5
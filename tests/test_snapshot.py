@@ -0,0 +1,79 @@
+"""
+Reading from the snapshot must give exactly the frames SQLite gives.
+"""
+import sqlite3
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import parser
+from datasource import MESSAGE_COLUMNS, read_messages, read_senders
+from metrics import METRIC_COLUMNS, TEXT_COLUMNS
+from snapshot import read_snapshot, snapshot_path, write_snapshot
+from synthetic import generate_lines
+
+@pytest.fixture(scope='module')
+def lines():
+    return list(generate_lines(2000, senders=4, days=60, seed=13))
+
+def ingest(workdir, lines):
+    input_file = workdir / 'chat.txt'
+    input_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    parser.parse_whatsapp_chat(str(input_file), str(workdir / 'chat.db'))
+    return str(workdir / 'chat.db')
+
+@pytest.fixture(scope='module')
+def databases(lines, tmp_path_factory):
+    """The same messages twice: with and without a snapshot next to them."""
+    db_file = ingest(tmp_path_factory.mktemp('snapshot'), lines)
+    sqlite_db = str(tmp_path_factory.mktemp('sqlite') / 'chat.db')
+    sqlite3.connect(db_file).backup(sqlite3.connect(sqlite_db))
+    write_snapshot(db_file)
+    return db_file, sqlite_db
+
+SELECTIONS = ['everything', 'two senders', 'part of the period', 'nothing']
+
+def selection(db_file, name):
+    return {
+        'everything': (None, None, None),
+        'two senders': (tuple(read_senders(db_file)[1:3]), None, None),
+        'part of the period': (None, date(2021, 1, 20), date(2021, 2, 5)),
+        'nothing': (None, date(2030, 1, 1), date(2030, 1, 31)),
+    }[name]
+
+@pytest.mark.parametrize('name', SELECTIONS)
+@pytest.mark.parametrize('columns, with_features', [
+    (MESSAGE_COLUMNS, True),
+    (METRIC_COLUMNS, True),
+    (TEXT_COLUMNS, False),
+])
+def test_snapshot_matches_sqlite(databases, name, columns, with_features):
+    db_file, sqlite_db = databases
+    users, start_date, end_date = selection(db_file, name)
+    assert read_snapshot(db_file, users, start_date, end_date) is not None
+
+    from_snapshot = read_messages(db_file, users, start_date, end_date, columns, with_features)
+    from_sqlite = read_messages(sqlite_db, users, start_date, end_date, columns, with_features)
+    pd.testing.assert_frame_equal(from_snapshot, from_sqlite)
+
+def test_snapshot_is_written_in_the_final_types(databases):
+    db_file, sqlite_db = databases
+    # The frame as stored, before read_messages converts anything. Only the
+    # text comes back as pandas' default string type, not string[pyarrow].
+    stored = read_snapshot(db_file).drop(columns='message_content')
+    expected = read_messages(sqlite_db).drop(columns=['message_content', 'is_double_text'])
+    assert stored.dtypes.to_dict() == expected.dtypes.to_dict()
+
+def test_stale_snapshot_is_ignored(lines, tmp_path):
+    db_file = ingest(tmp_path, lines[:1500])
+    write_snapshot(db_file)
+    assert read_snapshot(db_file) is not None
+
+    ingest(tmp_path, lines)
+    assert read_snapshot(db_file) is None
+    assert len(read_messages(db_file)) > 1500
+
+def test_missing_snapshot(tmp_path):
+    assert read_snapshot(str(tmp_path / 'chat.db')) is None
+    assert snapshot_path(str(tmp_path / 'chat.db')) == str(tmp_path / 'chat.arrow')
@@ -0,0 +1,66 @@
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from streaks import longest_group_run, user_streaks
+
+def old_longest_streak(dates):
+    # The loop the dashboard used before streaks.py
+    if len(dates) == 0:
+        return 0
+    dates = sorted(set(dates))
+    longest_streak = 0
+    current_streak = 1
+    for i in range(1, len(dates)):
+        if (dates[i] - dates[i - 1]).days == 1:
+            current_streak += 1
+        else:
+            longest_streak = max(longest_streak, current_streak)
+            current_streak = 1
+    return max(longest_streak, current_streak)
+
+def day_by_day(dates, reference_date):
+    """current_streak and longest_silence, one day at a time."""
+    active = set(dates)
+    day = max(active)
+    current = 0
+    if day >= reference_date - timedelta(days=1):
+        while day in active:
+            current += 1
+            day -= timedelta(days=1)
+
+    longest_silence = silence = 0
+    day = min(active)
+    while day <= reference_date:
+        silence = 0 if day in active else silence + 1
+        longest_silence = max(longest_silence, silence)
+        day += timedelta(days=1)
+    return current, longest_silence
+
+def random_activity(seed):
+    rng = random.Random(seed)
+    start = date(2022, 1, 1)
+    return pd.DataFrame([
+        {'sender': rng.choice('ABCDE'), 'date': start + timedelta(days=rng.randrange(120))}
+        for _ in range(rng.randrange(1, 400))
+    ])
+
+@pytest.mark.parametrize('seed', range(10))
+def test_streaks_match_the_old_loop(seed):
+    activity = random_activity(seed)
+    reference_date = activity['date'].max()
+
+    streaks = user_streaks(activity).set_index('sender')
+    for sender, dates in activity.groupby('sender')['date']:
+        assert streaks.loc[sender, 'longest_streak'] == old_longest_streak(list(dates))
+        current, silence = day_by_day(list(dates), reference_date)
+        assert streaks.loc[sender, 'current_streak'] == current
+        assert streaks.loc[sender, 'longest_silence'] == silence
+    assert longest_group_run(activity) == old_longest_streak(list(activity['date']))
+
+def test_no_activity():
+    empty = pd.DataFrame(columns=['sender', 'date'])
+    assert user_streaks(empty).empty
+    assert longest_group_run(empty) == 0
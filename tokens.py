@@ -0,0 +1,72 @@
+"""
+Word counts per sender, maintained by parser.py at ingest time.
+
+token_counts holds (sender, token, count) for the whole chat. With --daily-tokens
+the parser also keeps token_counts_daily, split per date, so the dashboard can
+answer date-filtered vocabulary questions without re-reading the messages.
+Tokens are lowercased \\w+ runs, the same split the vocabulary chart always used.
+"""
+import re
+from collections import Counter
+
+token_pattern = re.compile(r'\b\w+\b')
+
+# Messages counted in memory before the counts are flushed to the database
+FLUSH_EVERY = 100000
+
+def tokenize(text):
+    return token_pattern.findall(text.lower()) if text else []
+
+def create_token_tables(cursor, daily=False):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS token_counts (
+            sender TEXT,
+            token TEXT,
+            count INTEGER,
+            PRIMARY KEY (sender, token)
+        ) WITHOUT ROWID
+    ''')
+    if daily:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS token_counts_daily (
+                date TEXT,
+                sender TEXT,
+                token TEXT,
+                count INTEGER,
+                PRIMARY KEY (date, sender, token)
+            ) WITHOUT ROWID
+        ''')
+
+def update_token_counts(cursor, after_id):
+    """
+    Adds the words of the messages with id > after_id to token_counts.
+    """
+    rows = cursor.connection.execute(
+        'SELECT sender, message_content FROM messages WHERE id > ?', (after_id,)
+    )
+    _upsert_counts(cursor, (((sender,), text) for sender, text in rows), '''
+        INSERT INTO token_counts (sender, token, count) VALUES (?, ?, ?)
+        ON CONFLICT (sender, token) DO UPDATE SET count = count + excluded.count
+    ''')
+
+def update_daily_token_counts(cursor, after_id):
+    """
+    Same as update_token_counts, but per date, for token_counts_daily.
+    """
+    rows = cursor.connection.execute(
+        'SELECT substr(timestamp, 1, 10), sender, message_content FROM messages WHERE id > ?', (after_id,)
+    )
+    _upsert_counts(cursor, (((date, sender), text) for date, sender, text in rows), '''
+        INSERT INTO token_counts_daily (date, sender, token, count) VALUES (?, ?, ?, ?)
+        ON CONFLICT (date, sender, token) DO UPDATE SET count = count + excluded.count
+    ''')
+
+def _upsert_counts(cursor, keyed_texts, upsert_sql):
+    counts = Counter()
+    for i, (key, text) in enumerate(keyed_texts, 1):
+        for token in tokenize(text):
+            counts[key + (token,)] += 1
+        if i % FLUSH_EVERY == 0:
+            cursor.executemany(upsert_sql, (k + (c,) for k, c in counts.items()))
+            counts.clear()
+    cursor.executemany(upsert_sql, (k + (c,) for k, c in counts.items()))